@@ -0,0 +1,400 @@
+# /////////////////////////////////////////////////////////////////////////////////////////////
+# ////---- Benchmark skenovania zón ----////
+# Spustenie: python benchmark.py --items 50000 --zones 60
+# Celý sken nad syntetickou SCUM.db: python benchmark.py --pipeline --sizes 1000,10000,100000,1000000 --output results.json
+# Len vygenerovanie databázy: python benchmark.py --generate SCUM.db --items 100000 --zones 60 --profiles 4
+# /////////////////////////////////////////////////////////////////////////////////////////////
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+import zlib
+from datetime import datetime
+
+# ////---- Načítanie logic.py z rovnakej zložky ----////
+# log.txt, data.ini, path.ini a metriky idú do work_dir už počas vykonania modulu (detekcia SCUM.db,
+# správy z načítania), takže benchmark nezapisuje do data/ ani config/ modulu. Log sa potom vypne.
+def load_logic(work_dir):
+    logic_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logic.py")
+    spec = importlib.util.spec_from_file_location("logic", logic_path)
+    logic = importlib.util.module_from_spec(spec)
+    logic.SAVEITEMS_WORK_DIR = work_dir
+    spec.loader.exec_module(logic)
+    logic.flush_log()
+    logic.log_to_console = lambda message, color=None: None
+    return logic
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Pôvodná slučka items × zones (referencia) ----////
+def classify_nested_loop(item_positions, all_zones):
+    items_to_protect = []
+    for item_id, (ix, iy) in item_positions.items():
+        for base in all_zones:
+            bx, by = base["x"], base["y"]
+            radius = base["radius"]
+            shape = base["shape"]
+            dx = abs(ix - bx)
+            dy = abs(iy - by)
+            if shape == "square":
+                if dx <= radius and dy <= radius:
+                    items_to_protect.append(item_id)
+                    break
+            elif shape == "circle":
+                if math.sqrt(dx**2 + dy**2) <= radius:
+                    items_to_protect.append(item_id)
+                    break
+    return items_to_protect
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Náhodné zóny a položky ----////
+# Mix zón zodpovedá predvolenému config.json (vlajky, ohniská)
+ZONE_MIX = [
+    (5000, "square"),
+    (800, "circle"),
+    (400, "circle"),
+]
+
+def random_zones(count, world, rng):
+    zones = []
+    for _ in range(count):
+        radius, shape = rng.choice(ZONE_MIX)
+        zones.append({
+            "x": rng.uniform(-world, world),
+            "y": rng.uniform(-world, world),
+            "asset": shape,
+            "radius": radius,
+            "shape": shape,
+        })
+    return zones
+
+# Časť položiek sa nahromadí okolo zón (loot na základni), zvyšok je rozhádzaný po svete
+def random_items(count, zones, world, rng, near_ratio=0.3):
+    items = {}
+    for item_id in range(1, count + 1):
+        if zones and rng.random() < near_ratio:
+            zone = rng.choice(zones)
+            spread = zone["radius"] * 1.2
+            items[item_id] = (zone["x"] + rng.uniform(-spread, spread), zone["y"] + rng.uniform(-spread, spread))
+        else:
+            items[item_id] = (rng.uniform(-world, world), rng.uniform(-world, world))
+    return items
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Syntetická SCUM.db ----////
+# Vytvorí tabuľky, ktoré číta a zapisuje logic.py (entity, entity_system, user_profile, virtualized_item,
+# base, base_element). Profil 1 je lokálny hráč (BP_Prisoner_ES s flags = 0), ostatné profily majú flags = 1.
+# Zóny sa rozdelia rovnomerne medzi základne všetkých profilov, asset každého prvku sa vyberie podľa
+# asset_mix [(asset, váha)]. Assety, ktoré nie sú v config.json, vytvoria prvok základne bez ochrannej zóny.
+WALL_ASSET = "/Game/ConZ_Files/BaseBuilding/BaseElements/BP_Wall_Wood.BP_Wall_Wood_C"
+
+def default_asset_mix(logic):
+    mix = [(zone["asset"], 1.0) for zone in logic.get_config().get("zones", [])]
+    mix.append((WALL_ASSET, 1.0))
+    return mix
+
+# "asset=váha,asset=váha" z príkazového riadku
+def parse_asset_mix(text):
+    mix = []
+    for part in text.split(","):
+        asset, _sep, weight = part.strip().rpartition("=")
+        mix.append((asset, float(weight)))
+    return mix
+
+def make_scum_db(path, items, zones, profiles=1, asset_mix=None, world=400000.0, near_ratio=0.3, seed=1):
+    rng = random.Random(seed)
+    asset_mix = asset_mix or [(WALL_ASSET, 1.0)]
+    assets = [asset for asset, _weight in asset_mix]
+    weights = [weight for _asset, weight in asset_mix]
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE entity(id INTEGER PRIMARY KEY, class TEXT, flags INTEGER, entity_system_id INTEGER, location_x REAL, location_y REAL);
+        CREATE TABLE entity_system(id INTEGER PRIMARY KEY, user_profile_id INTEGER);
+        CREATE TABLE user_profile(id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE virtualized_item(item_entity_id INTEGER PRIMARY KEY, can_expire INTEGER);
+        CREATE TABLE base(id INTEGER PRIMARY KEY, user_profile_id INTEGER);
+        CREATE TABLE base_element(id INTEGER PRIMARY KEY, base_id INTEGER, asset TEXT, location_x REAL, location_y REAL);
+    """)
+    profile_ids = range(1, max(1, profiles) + 1)
+    conn.executemany("INSERT INTO user_profile(id, name) VALUES (?, ?)", ((pid, f"Prisoner{pid}") for pid in profile_ids))
+    conn.executemany("INSERT INTO entity_system(id, user_profile_id) VALUES (?, ?)", ((pid, pid) for pid in profile_ids))
+    conn.executemany(
+        "INSERT INTO entity(id, class, flags, entity_system_id, location_x, location_y) VALUES (?, 'BP_Prisoner_ES', ?, ?, 0, 0)",
+        ((pid, 0 if pid == 1 else 1, pid) for pid in profile_ids),
+    )
+    conn.executemany("INSERT INTO base(id, user_profile_id) VALUES (?, ?)", ((pid, pid) for pid in profile_ids))
+
+    elements = []
+    for index in range(zones):
+        elements.append((
+            profile_ids[index % len(profile_ids)],
+            rng.choices(assets, weights)[0],
+            rng.uniform(-world, world),
+            rng.uniform(-world, world),
+        ))
+    conn.executemany("INSERT INTO base_element(base_id, asset, location_x, location_y) VALUES (?, ?, ?, ?)", elements)
+
+    # Časť položiek leží pri prvkoch základní, zvyšok je rozhádzaný po svete
+    first_item_id = len(profile_ids) + 1
+    def item_rows():
+        for item_id in range(first_item_id, first_item_id + items):
+            if elements and rng.random() < near_ratio:
+                _base, _asset, ex, ey = rng.choice(elements)
+                yield item_id, ex + rng.uniform(-6000, 6000), ey + rng.uniform(-6000, 6000)
+            else:
+                yield item_id, rng.uniform(-world, world), rng.uniform(-world, world)
+    rows = list(item_rows())
+    conn.executemany(
+        "INSERT INTO entity(id, class, flags, entity_system_id, location_x, location_y) VALUES (?, 'BP_Item', 0, 0, ?, ?)",
+        rows,
+    )
+    conn.executemany("INSERT INTO virtualized_item(item_entity_id, can_expire) VALUES (?, 1)", ((row[0],) for row in rows))
+    conn.commit()
+    conn.close()
+    return path
+# ////-----------------------------------------------------------------------------------------
+
+def best_time(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+# ////---- Porovnanie pôvodnej slučky a priestorového indexu ----////
+def bench_containment(logic, items, zones, repeat=3, cell_size=0, process_workers=None):
+    loop_time, expected = best_time(lambda: classify_nested_loop(items, zones), repeat)
+    build_time, zone_index = best_time(lambda: logic.ZoneIndex(zones, cell_size), repeat)
+    index_time, (protected, _outside) = best_time(lambda: logic.classify_items(items, zone_index), repeat)
+    if sorted(protected) != sorted(expected):
+        raise AssertionError("ZoneIndex vrátil iný výsledok ako pôvodná slučka")
+    result = {
+        "items": len(items),
+        "zones": len(zones),
+        "protected": len(expected),
+        "nested_loop_s": loop_time,
+        "index_build_s": build_time,
+        "index_s": index_time,
+        "numpy_s": None,
+        "process_s": None,
+    }
+    # Diferenciálna kontrola NumPy klasifikátora voči pôvodnej slučke
+    if logic.np is not None:
+        numpy_time, (protected, _outside) = best_time(lambda: logic.classify_items_numpy(items, zone_index), repeat)
+        if sorted(protected) != sorted(expected):
+            raise AssertionError("NumPy klasifikátor vrátil iný výsledok ako pôvodná slučka")
+        result["numpy_s"] = numpy_time
+    # Klasifikácia v procesoch (prvé spustenie procesov sa nemeria)
+    if process_workers is not None:
+        config = dict(logic.get_config(), process_workers=process_workers)
+        logic.classify_items_process(items, zone_index, config)
+        process_time, (protected, _outside) = best_time(lambda: logic.classify_items_process(items, zone_index, config), repeat)
+        logic.close_process_pool()
+        if logic.process_pool["failed"]:
+            raise AssertionError("Klasifikácia v procesoch sa nespustila")
+        if sorted(protected) != sorted(expected):
+            raise AssertionError("Klasifikácia v procesoch vrátila iný výsledok ako pôvodná slučka")
+        result["process_s"] = process_time
+    return result
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Benchmark celého skenu nad SCUM.db ----////
+# Meria celý tik hlavnej slučky (scan_once + update_data_ini) pri plnom aj inkrementálnom skene
+# a každú dotazovú funkciu zvlášť. Pred každým meraním sa položky vrátia na can_expire = 1
+# a stav logiky sa vynuluje, takže opakovania sú porovnateľné. data.ini, metrics.json a log
+# sa zapisujú do dočasnej zložky, nie do data/ modulu.
+def reset_logic_state(logic, db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE virtualized_item SET can_expire = 1")
+    conn.commit()
+    conn.close()
+    logic.reset_scan_state()
+    logic.write_state["pending"] = []
+    logic.write_state["zones"] = {}
+    logic.zone_cache["key"] = None
+    logic.zone_cache["zones"] = None
+
+def bench_pipeline(logic, db_path, repeat=3):
+    logic.DB_PATH = db_path
+    config = dict(logic.get_config(), skip_unchanged=False)
+    logic.get_config = lambda: config
+
+    # Indexy sa postavia vopred (synchrónne), ako by boli po prvom spustení modulu
+    probe = logic.open_writer_connection()
+    logic.build_indexes(logic.plan_indexes(probe))
+    logic.close_db_connection(probe)
+    conn = logic.open_db_connection()
+
+    def tick():
+        result = logic.scan_once(conn)
+        logic.update_data_ini(scan_interval=config.get("scan_interval", 1))
+        return result
+
+    full_times = []
+    incremental_times = []
+    result = None
+    for _ in range(repeat):
+        reset_logic_state(logic, db_path)
+        start = time.perf_counter()
+        result = tick()
+        full_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        tick()
+        incremental_times.append(time.perf_counter() - start)
+
+    # Jednotlivé dotazové funkcie nad stavom pred ochranou
+    reset_logic_state(logic, db_path)
+    user_profile_id = logic.get_user_profile_id(conn)
+    expiring_ids = logic.get_expiring_items(conn)
+    queries = {
+        "get_user_profile_id": best_time(lambda: logic.get_user_profile_id(conn), repeat)[0],
+        "get_user_name": best_time(lambda: logic.get_user_name(conn, user_profile_id), repeat)[0],
+        "get_all_zones_positions": best_time(lambda: logic.get_all_zones_positions(conn, user_profile_id), repeat)[0],
+        "get_expiring_items": best_time(lambda: logic.get_expiring_items(conn), repeat)[0],
+        "get_max_item_rowid": best_time(lambda: logic.get_max_item_rowid(conn), repeat)[0],
+        "get_item_positions": best_time(lambda: logic.get_item_positions(conn, expiring_ids), repeat)[0],
+    }
+    writer = logic.open_writer_connection()
+    queries["update_can_expire"] = best_time(lambda: logic.update_can_expire(writer, expiring_ids), 1)[0]
+    logic.close_db_connection(writer)
+    logic.close_db_connection(conn)
+    reset_logic_state(logic, db_path)
+
+    return {
+        "expiring_items": len(expiring_ids),
+        "protected": result["protected"] if result else 0,
+        "full_tick_s": min(full_times),
+        "incremental_tick_s": min(incremental_times),
+        "queries": queries,
+    }
+
+# Čas plného čítania (ID + pozície) pre rôzny počet vlákien; výsledok musí byť rovnaký ako sériový
+def bench_read_scaling(logic, db_path, workers_list, repeat=3):
+    logic.DB_PATH = db_path
+    conn = logic.open_db_connection()
+    upto = logic.get_max_item_rowid(conn)
+    expected = None
+    timings = {}
+    for workers in workers_list:
+        config = dict(logic.get_config(), read_workers=workers, read_parallel_min_rows=0)
+        elapsed, (item_ids, positions) = best_time(lambda: logic.read_expiring_positions(conn, 0, upto, config), repeat)
+        if expected is None:
+            expected = positions
+        elif positions != expected:
+            raise AssertionError(f"Paralelné čítanie ({workers} vlákien) vrátilo iný výsledok")
+        timings[str(workers)] = elapsed
+    logic.close_read_pool()
+    logic.close_db_connection(conn)
+    return timings
+
+def run_pipeline_suite(sizes, zones, profiles, repeat, seed, db_dir, output, asset_mix=None, read_workers=None):
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "zones": zones,
+        "profiles": profiles,
+        "asset_mix": asset_mix,
+        "repeat": repeat,
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for items in sizes:
+            # Každá veľkosť dostane čerstvý modul, aby sa cache a stav nepreniesli medzi behmi
+            logic = load_logic(work_dir)
+
+            mix = asset_mix or default_asset_mix(logic)
+            mix_key = zlib.crc32(json.dumps(mix).encode()) % 100000
+            db_path = os.path.join(db_dir or work_dir, f"scum_{items}_{zones}_{profiles}_{seed}_{mix_key}.db")
+            start = time.perf_counter()
+            if not os.path.exists(db_path):
+                make_scum_db(db_path, items, zones, profiles, mix, seed=seed)
+            generate_time = time.perf_counter() - start
+
+            run = {"items": items, "db_bytes": os.path.getsize(db_path), "generate_s": generate_time}
+            run.update(bench_pipeline(logic, db_path, repeat))
+            if read_workers:
+                run["read_scaling"] = bench_read_scaling(logic, db_path, read_workers, repeat)
+            results["runs"].append(run)
+            print(
+                f"items={items:>8} expiring={run['expiring_items']:>8} protected={run['protected']:>7} "
+                f"full={run['full_tick_s'] * 1000:9.2f} ms incremental={run['incremental_tick_s'] * 1000:8.2f} ms"
+            )
+            for name, seconds in run["queries"].items():
+                print(f"    {name:<24} {seconds * 1000:9.2f} ms")
+            for workers, seconds in run.get("read_scaling", {}).items():
+                print(f"    read x{workers:<18} {seconds * 1000:9.2f} ms")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Výsledky zapísané do {output}")
+    return results
+# ////-----------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark klasifikácie položiek v zónach")
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--zones", type=int, default=60)
+    parser.add_argument("--world", type=float, default=400000.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cell", type=float, default=0, help="veľkosť bunky mriežky (0 = automaticky)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--process-workers", type=int, default=None, help="porovná aj classifier = process s daným počtom procesov (0 = automaticky)")
+    parser.add_argument("--pipeline", action="store_true", help="meranie celého skenu nad syntetickou SCUM.db")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="počty položiek pre --pipeline")
+    parser.add_argument("--profiles", type=int, default=1)
+    parser.add_argument("--db-dir", default=None, help="zložka pre vygenerované databázy (znovu sa použijú)")
+    parser.add_argument("--output", default=None, help="JSON súbor s výsledkami")
+    parser.add_argument("--generate", metavar="PATH", default=None, help="len vygeneruje SCUM.db do PATH")
+    parser.add_argument("--read-workers", default=None, help="počty vlákien paralelného čítania pre --pipeline, napr. 1,2,4,8")
+    parser.add_argument("--asset-mix", default=None, help="mix assetov zón: asset=váha,asset=váha (predvolene zóny z config.json + stena)")
+    args = parser.parse_args()
+    asset_mix = parse_asset_mix(args.asset_mix) if args.asset_mix else None
+
+    if args.generate:
+        if not asset_mix:
+            with tempfile.TemporaryDirectory() as work_dir:
+                asset_mix = default_asset_mix(load_logic(work_dir))
+        make_scum_db(args.generate, args.items, args.zones, args.profiles, asset_mix, args.world, seed=args.seed)
+        print(f"SCUM.db vygenerovaná: {args.generate}")
+        return
+    if args.pipeline:
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+        read_workers = [int(workers) for workers in args.read_workers.split(",")] if args.read_workers else None
+        run_pipeline_suite(sizes, args.zones, args.profiles, args.repeat, args.seed, args.db_dir, args.output, asset_mix, read_workers)
+        return
+
+    rng = random.Random(args.seed)
+    zones = random_zones(args.zones, args.world, rng)
+    items = random_items(args.items, zones, args.world, rng)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        logic = load_logic(work_dir)
+        result = bench_containment(logic, items, zones, args.repeat, args.cell, args.process_workers)
+    print(f"items={result['items']} zones={result['zones']} protected={result['protected']}")
+    print(f"nested loop : {result['nested_loop_s'] * 1000:9.2f} ms")
+    print(f"index build : {result['index_build_s'] * 1000:9.2f} ms")
+    print(f"zone index  : {result['index_s'] * 1000:9.2f} ms")
+    print(f"speedup     : {result['nested_loop_s'] / max(result['index_s'], 1e-9):9.1f}x")
+    if result["numpy_s"] is not None:
+        print(f"numpy       : {result['numpy_s'] * 1000:9.2f} ms")
+    else:
+        print("numpy       : nie je nainštalované")
+    if result["process_s"] is not None:
+        print(f"process     : {result['process_s'] * 1000:9.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -8,28 +8,181 @@ import configparser
 import os
 import json
 import platform
+import random
+import pathlib
+import contextlib
+import re
+import sys
+import types
+import threading
+import queue
+import atexit
+import concurrent.futures
+import multiprocessing
+import importlib.util
+import array
+import site
+import runpy
+import argparse
+import collections
+import select
+import struct
+import ctypes
+import ctypes.util
 from datetime import datetime
 
+# Voliteľná knižnica NumPy pre vektorovú klasifikáciu položiek (bez nej sa použije čistý Python)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # import main  # Importovanie hlavného modulu pre prístup k MODLOADER_VERSION nefunguje ak je binárny.
 # from main import MODLOADER_VERSION  # Importovanie verzie modloadera nefunguje ak je binárny.
 
 # ////---- Cesty k súborom ----////
+# Zapisované súbory (data/ a path.ini) môže presmerovať ten, kto modul načíta (benchmark.py), cez
+# globálnu SAVEITEMS_WORK_DIR nastavenú pred vykonaním modulu; config.json sa číta vždy z modulu.
 module_root = os.path.dirname(os.path.dirname(__file__))
+work_dir = globals().get("SAVEITEMS_WORK_DIR")
+data_dir = work_dir or os.path.join(module_root, 'data')
 config_path = os.path.join(module_root, 'config', 'config.json')
-data_path = os.path.join(module_root, 'data', 'data.ini')
-log_path = os.path.join(module_root, 'data', 'log.txt')
-path_ini_path = os.path.join(module_root, 'config' ,'path.ini')
+data_path = os.path.join(data_dir, 'data.ini')
+log_path = os.path.join(data_dir, 'log.txt')
+metrics_path = os.path.join(data_dir, 'metrics.json')
+dry_run_path = os.path.join(data_dir, 'dry_run.json')
+journal_path = os.path.join(data_dir, 'journal.db')
+path_ini_path = os.path.join(work_dir or os.path.join(module_root, 'config'), 'path.ini')
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Zbernica udalostí pre widgety v tom istom procese ----////
+# Logika publikuje stav ("status") a riadky logu ("log"), widgety sa prihlásia cez subscribe.
+# Callback beží vo vlákne logiky, widget si ho cez Qt signál presunie do GUI vlákna.
+# Zbernica je uložená v sys.modules pod STATUS_BUS_MODULE, aby ju widgety našli bez importu logic.py.
+# Ak logika beží v inom procese (logic_process), udalosti z neho sem preposiela supervisor cez pipe;
+# ak logika beží úplne mimo modloadera, zbernica tu neexistuje a widgety čítajú data.ini / log.txt.
+STATUS_BUS_MODULE = "saveitems_status_bus"
+
+class StatusBus:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.last = {}
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def publish(self, topic, payload):
+        with self.lock:
+            self.last[topic] = payload
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(topic, payload)
+            except Exception as e:
+                print(f"[LOGIC] Chyba v odberateľovi zbernice: {e}")
+
+    def last_value(self, topic, default=None):
+        with self.lock:
+            return self.last.get(topic, default)
+
+def get_status_bus():
+    registry = sys.modules.get(STATUS_BUS_MODULE)
+    if registry is None:
+        registry = types.ModuleType(STATUS_BUS_MODULE)
+        registry.bus = StatusBus()
+        sys.modules[STATUS_BUS_MODULE] = registry
+    return registry.bus
+
+# Kto modul načíta len pre dry-run (widget files.py), nastaví pred vykonaním SAVEITEMS_PRIVATE_BUS:
+# zbernica sa nezaregistruje do sys.modules, inak by sa na ňu prihlásili widgety a nikto by na ňu
+# nepublikoval (logika beží mimo modloadera a widgety majú čítať data.ini / log.txt).
+status_bus = StatusBus() if globals().get("SAVEITEMS_PRIVATE_BUS") else get_status_bus()
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Logovanie do log.txt ktorý si načíta GUI widget console ----////
+# Správy idú do fronty a zapisuje ich vlákno na pozadí, takže logic vlákno nečaká na disk.
+# Keď by log.txt prekročil log_max_bytes, rotuje sa na log.1.txt ... log.N.txt (N = log_backup_count).
+# V procese logiky (logic_process = true) idú riadky cez pipe a do log.txt ich zapisuje len rodič.
+# SAVEITEMS_PIPE dostane potomok v init_globals, takže sa cez pipe posielajú už správy z načítania
+# modulu; run_logic_child potom "send" nahradí verziou so zámkom.
+log_queue = queue.Queue()
+log_writer_lock = threading.Lock()
+log_writer_thread = None
+log_sink = {"send": getattr(globals().get("SAVEITEMS_PIPE"), "send", None)}
+
 def log_to_console(message, color=None):
     timestamp = datetime.now().strftime("%H:%M:%S")
     line = f"[{timestamp}] {message}\n"
-    try:
-        with open(log_path, 'a') as f:
-            f.write(line)
-    except Exception as e:
-        print(f"[LOGIC] Chyba pri zápise do log.txt: {e}")
+    if log_sink["send"] is not None:
+        log_sink["send"](("log", line))
+        return
+    write_log_line(line)
+
+def write_log_line(line):
+    ensure_log_writer()
+    log_queue.put(line)
+    status_bus.publish("log", line.rstrip("\n"))
+
+def ensure_log_writer():
+    global log_writer_thread
+    if log_writer_thread is not None and log_writer_thread.is_alive():
+        return
+    with log_writer_lock:
+        if log_writer_thread is None or not log_writer_thread.is_alive():
+            log_writer_thread = threading.Thread(target=log_writer_loop, name="SaveItemsLogWriter", daemon=True)
+            log_writer_thread.start()
+
+def rotated_log_path(index):
+    root, ext = os.path.splitext(log_path)
+    return f"{root}.{index}{ext}"
+
+def rotate_log(backup_count):
+    if backup_count <= 0:
+        os.remove(log_path)
+        return
+    for index in range(backup_count - 1, 0, -1):
+        if os.path.exists(rotated_log_path(index)):
+            os.replace(rotated_log_path(index), rotated_log_path(index + 1))
+    os.replace(log_path, rotated_log_path(1))
+
+def log_writer_loop():
+    while True:
+        lines = [log_queue.get()]
+        # Všetko, čo sa medzitým nazbieralo, sa zapíše naraz
+        while True:
+            try:
+                lines.append(log_queue.get_nowait())
+            except queue.Empty:
+                break
+        # Cache configu sa tu len číta, aby vlákno logu nikdy nečítalo config.json
+        config = config_cache["config"] or {}
+        max_bytes = config.get("log_max_bytes", 262144)
+        backup_count = config.get("log_backup_count", 3)
+        text = "".join(lines)
+        try:
+            # Rotácia pred zápisom, aby log.txt vždy obsahoval najnovšie riadky
+            size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+            if max_bytes and size > 0 and size + len(text) > max_bytes:
+                rotate_log(backup_count)
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+        except Exception as e:
+            print(f"[LOGIC] Chyba pri zápise do log.txt: {e}")
+        for _ in lines:
+            log_queue.task_done()
+
+# Počká, kým vlákno zapíše všetky správy z fronty
+def flush_log():
+    if log_writer_thread is not None and log_writer_thread.is_alive():
+        log_queue.join()
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Automatická detekcia cesty k SCUM.db ----////
@@ -79,9 +232,49 @@ def detect_db_path():
 
 # ////---- Načítanie alebo vytvorenie config.json ----////
 # Ak config.json neexistuje, vytvorí sa s predvolenými hodnotami
-def load_or_create_config():
-    default_config = {
+def get_default_config():
+    return {
         "scan_interval": 1,
+        "incremental_scan": True,
+        "full_rescan_interval": 300,
+        "zone_grid_cell": 0,
+        "scan_mode": "python",
+        "classifier": "python",
+        "numpy_min_items": 5000,
+        "numpy_chunk_items": 4096,
+        "bulk_chunk_size": 500,
+        "skip_unchanged": True,
+        "scan_interval_min": 2,
+        "scan_interval_max": 64,
+        "scan_backoff_factor": 2.0,
+        "scan_idle_scans": 3,
+        "watch_db": True,
+        "watch_debounce": 0.5,
+        "log_max_bytes": 262144,
+        "log_backup_count": 3,
+        "status_heartbeat": 60,
+        "auto_indexes": True,
+        "read_only_reader": True,
+        "non_invasive": False,
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "write_batch_size": 2000,
+        "write_max_retries": 5,
+        "write_backoff": 0.05,
+        "write_busy_timeout": 50,
+        "metrics_interval": 30,
+        "metrics_window": 256,
+        "profiles_mode": "local",
+        "profiles_allow": [],
+        "read_workers": 1,
+        "read_parallel_min_rows": 50000,
+        "process_workers": 0,
+        "process_batch_items": 50000,
+        "process_min_items": 200000,
+        "logic_process": False,
+        "logic_restart_max_delay": 30,
+        "journal": True,
+        "restore_chunk_size": 5000,
         "zones": [
             {
                 "asset": "/Game/ConZ_Files/BaseBuilding/BaseElements/BP_Base_Flag.BP_Base_Flag_C",
@@ -96,41 +289,254 @@ def load_or_create_config():
         ]
     }
 
+def read_config_file(default_config):
+    with open(config_path, 'r', encoding='utf-8') as f:
+        user_config = json.load(f)
+    for key in default_config:
+        if key not in user_config:
+            user_config[key] = default_config[key]
+    return user_config
+
+def load_or_create_config():
+    default_config = get_default_config()
+
     if not os.path.exists(config_path):
         with open(config_path, 'w', encoding='utf-8') as f:
             json.dump(default_config, f, indent=4)
         return default_config
 
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            user_config = json.load(f)
-        for key in default_config:
-            if key not in user_config:
-                user_config[key] = default_config[key]
-        return user_config
+        return read_config_file(default_config)
     except Exception as e:
         log_to_console(f"[LOGIC] Chyba pri načítaní config.json: {e}")
         return default_config
 # ////-----------------------------------------------------------------------------------------
 
+# ////---- Cache config.json podľa mtime a veľkosti súboru ----////
+# Súbor sa znovu načíta a pravidlá zón sa prekompilujú len keď sa zmení jeho mtime alebo veľkosť.
+# Pri chybnom JSON ostáva platná posledná dobrá konfigurácia a chyba sa zaloguje len raz na každú zmenu súboru.
+config_cache = {
+    "key": None,          # (mtime_ns, size) naposledy spracovaného súboru
+    "config": None,       # posledná platná konfigurácia
+    "asset_rules": {},    # asset -> pravidlo zóny
+    "version": 0,         # zvýši sa pri každom načítaní novej platnej konfigurácie
+}
+
+def config_file_key():
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def compile_asset_rules(config):
+    return {entry["asset"]: entry for entry in config.get("zones", [])}
+
+def set_cached_config(config, key):
+    config_cache["config"] = config
+    config_cache["asset_rules"] = compile_asset_rules(config)
+    config_cache["key"] = key
+    config_cache["version"] += 1
+
+def get_config():
+    key = config_file_key()
+    if config_cache["config"] is not None and key is not None and key == config_cache["key"]:
+        return config_cache["config"]
+
+    # config.json chýba - vytvorí sa s predvolenými hodnotami
+    if key is None:
+        set_cached_config(load_or_create_config(), config_file_key())
+        return config_cache["config"]
+
+    try:
+        set_cached_config(read_config_file(get_default_config()), key)
+    except Exception as e:
+        log_to_console(f"[LOGIC] Chyba pri načítaní config.json: {e} (ponechávam poslednú platnú konfiguráciu)")
+        if config_cache["config"] is None:
+            set_cached_config(get_default_config(), key)
+        else:
+            config_cache["key"] = key
+    return config_cache["config"]
+
+def get_asset_rules():
+    get_config()
+    return config_cache["asset_rules"]
+# ////-----------------------------------------------------------------------------------------
+
 # ////---- Funkcia na aktualizáciu data.ini ----////
-def update_data_ini(prisoner_name=None, zones_count=None):
+# Hodnoty sa držia v pamäti (data_ini) a súbor sa prepíše len keď sa zmení niektorá významná hodnota
+# (meno, počet zón, interval, počet uložených položiek). Volatilné sekcie (čas a trvanie skenu,
+# štatistiky cache a zápisov) sa pribalia k takému zápisu, alebo sa zapíšu najneskôr raz za status_heartbeat sekúnd.
+# Zápis ide do dočasného súboru a os.replace, takže widget nikdy nenačíta rozpísaný súbor.
+STATUS_VOLATILE_SECTIONS = {"zone_cache", "last_scan", "writes"}
+
+status_state = {
+    "published": None,   # významné sekcie pri poslednom zápise
+    "last_write": 0.0,
+    "items_saved": 0,    # počet ochránených položiek od spustenia modulu
+    "profile_saved": {}, # profile_id -> počet ochránených položiek od spustenia modulu
+}
+
+def set_status_values(prisoner_name=None, zones_count=None, zone_cache_stats=None, scan_interval=None, last_scan=None, write_telemetry=None, profiles=None):
     if prisoner_name is not None:
         data_ini['prisoner'] = {'name': prisoner_name}
     if zones_count is not None:
         data_ini['all_zones'] = {'count': str(zones_count)}
+    if zone_cache_stats is not None:
+        data_ini['zone_cache'] = {
+            'hits': str(zone_cache_stats['hits']),
+            'misses': str(zone_cache_stats['misses']),
+            'hit_rate': f"{zone_cache_stats['hit_rate']:.3f}",
+            'fingerprint_ms': f"{zone_cache_stats['fingerprint_ms']:.3f}",
+        }
+    if scan_interval is not None:
+        data_ini['scan'] = {'interval': f"{scan_interval:g}"}
+    if last_scan is not None:
+        data_ini['last_scan'] = {
+            'time': datetime.fromtimestamp(last_scan['time']).strftime("%H:%M:%S"),
+            'duration_ms': f"{last_scan['duration'] * 1000:.1f}",
+            'skipped': str(last_scan['skipped']).lower(),
+        }
+    if write_telemetry is not None:
+        data_ini['writes'] = {
+            'lock_wait_ms': f"{write_telemetry['lock_wait'] * 1000:.1f}",
+            'busy': str(write_telemetry['busy']),
+            'rows': str(write_telemetry['rows']),
+            'transactions': str(write_telemetry['transactions']),
+            'requeued': str(write_telemetry['requeued']),
+        }
+    if profiles is not None:
+        # Sekcia [profile.<id>] pre každý profil so zónami (v režime "local" len jeden)
+        for name in [name for name in data_ini.sections() if name.startswith('profile.')]:
+            data_ini.remove_section(name)
+        for profile_id, profile in sorted(profiles.items()):
+            data_ini[f'profile.{profile_id}'] = {
+                'name': profile['name'],
+                'zones': str(profile['zones']),
+                'items_saved': str(status_state['profile_saved'].get(profile_id, 0)),
+            }
+    data_ini['session'] = {'items_saved': str(status_state['items_saved'])}
+
+def publish_status(force=False):
+    significant = {
+        name: dict(data_ini[name])
+        for name in data_ini.sections()
+        if name not in STATUS_VOLATILE_SECTIONS
+    }
+    heartbeat = (config_cache["config"] or {}).get("status_heartbeat", 60)
+    now = time.time()
+    if not force and significant == status_state["published"] and now - status_state["last_write"] < heartbeat:
+        return False
 
+    temp_path = data_path + ".tmp"
     try:
-        with open(data_path, 'w') as configfile:
+        with open(temp_path, 'w') as configfile:
             data_ini.write(configfile)
+        os.replace(temp_path, data_path)
     except Exception as e:
         print(f"[LOGIC] Chyba pri zápise do data.ini: {e}")
+        return False
+    status_state["published"] = significant
+    status_state["last_write"] = now
+    return True
+
+def update_data_ini(prisoner_name=None, zones_count=None, zone_cache_stats=None, scan_interval=None, last_scan=None):
+    set_status_values(prisoner_name, zones_count, zone_cache_stats, scan_interval, last_scan)
+    publish_status()
+    # Widgety v tom istom procese dostanú stav okamžite, bez čakania na súbor
+    status_bus.publish("status", {name: dict(data_ini[name]) for name in data_ini.sections()})
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Meranie trvania fáz skenu (metrics.json) ----////
+# Každá fáza si drží posledných metrics_window trvaní (deque), percentily sa počítajú až pri zápise.
+# Meranie stojí dve volania perf_counter a jeden append, preto môže byť zapnuté stále.
+# metrics.json sa zapíše najviac raz za metrics_interval sekúnd (0 = nezapisovať) cez dočasný súbor a os.replace.
+metrics_state = {
+    "phases": {},      # fáza -> deque trvaní v sekundách
+    "totals": {},      # fáza -> počet meraní od spustenia
+    "counts": {},      # názov -> {"last": ..., "max": ...}
+    "window": 256,
+    "last_write": 0.0,
+}
+
+def record_phase(phase, elapsed):
+    samples = metrics_state["phases"].get(phase)
+    if samples is None:
+        samples = metrics_state["phases"][phase] = collections.deque(maxlen=metrics_state["window"])
+    samples.append(elapsed)
+    metrics_state["totals"][phase] = metrics_state["totals"].get(phase, 0) + 1
+
+@contextlib.contextmanager
+def measure(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start)
+
+def record_count(name, value):
+    count = metrics_state["counts"].setdefault(name, {"last": 0, "max": 0})
+    count["last"] = value
+    count["max"] = max(count["max"], value)
+
+def percentile(sorted_samples, fraction):
+    index = max(0, math.ceil(fraction * len(sorted_samples)) - 1)
+    return sorted_samples[index]
+
+def get_metrics():
+    phases = {}
+    for phase, samples in metrics_state["phases"].items():
+        ordered = sorted(samples)
+        phases[phase] = {
+            "count": metrics_state["totals"][phase],
+            "last_ms": round(samples[-1] * 1000, 3),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+            "max_ms": round(ordered[-1] * 1000, 3),
+        }
+    return {
+        "updated": datetime.now().isoformat(timespec="seconds"),
+        "window": metrics_state["window"],
+        "phases": phases,
+        "counts": {name: dict(count) for name, count in metrics_state["counts"].items()},
+    }
+
+def publish_metrics(config, force=False):
+    window = max(1, int(config.get("metrics_window", 256)))
+    if window != metrics_state["window"]:
+        metrics_state["window"] = window
+        for phase, samples in metrics_state["phases"].items():
+            metrics_state["phases"][phase] = collections.deque(samples, maxlen=window)
+
+    interval = config.get("metrics_interval", 30)
+    now = time.time()
+    if not interval or (not force and now - metrics_state["last_write"] < interval):
+        return False
+
+    temp_path = metrics_path + ".tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(get_metrics(), f, indent=4)
+        os.replace(temp_path, metrics_path)
+    except Exception as e:
+        print(f"[LOGIC] Chyba pri zápise do metrics.json: {e}")
+        return False
+    metrics_state["last_write"] = now
+    return True
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Načítanie config.json a nastavenie SCAN_INTERVAL ----////
 # Ak config.json neexistuje, vytvorí sa s predvolenými hodnotami
-config_json = load_or_create_config()
+config_json = get_config()
 SCAN_INTERVAL = config_json.get("scan_interval", 8)
+
+# Zmena scan_interval v config.json sa prejaví bez reštartu
+def apply_scan_interval(config):
+    global SCAN_INTERVAL
+    scan_interval = config.get("scan_interval", 8)
+    if scan_interval != SCAN_INTERVAL:
+        log_to_console(f"[LOGIC] scan_interval: {SCAN_INTERVAL} -> {scan_interval}")
+        SCAN_INTERVAL = scan_interval
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Načítanie konfiguračného súboru pre data.ini ----////
@@ -147,43 +553,137 @@ DB_PATH = detect_db_path()
 # //////////////////////////////////////////////////////////////////////////////////////////////
 
 # ////---- Zabezpečenie indexov v databáze ----////
-def ensure_indexes(conn):
-    try:
-        cursor = conn.cursor()
+# Každý kandidát na index je viazaný na dotaz modulu, ktorý ho potrebuje.
+# Schéma (sqlite_master) sa prečíta raz, kandidáti, ktorých stĺpce už pokrýva iný index alebo
+# INTEGER PRIMARY KEY, sa preskočia ako nadbytočné a EXPLAIN QUERY PLAN overí, či dotaz naozaj
+# prechádza celú tabuľku. Chýbajúce indexy sa vytvoria na pozadí, po jednom, s logovaním času.
+INDEX_CANDIDATES = [
+    # (názov indexu, tabuľka, stĺpce, dotaz modulu, parametre pre EXPLAIN)
+    ("idx_entity_class", "entity", ("class",),
+        "SELECT entity_system_id FROM entity WHERE class = 'BP_Prisoner_ES' AND flags = 0", ()),
+    ("idx_entity_id", "entity", ("id",),
+        "SELECT id, location_x, location_y FROM entity WHERE id IN (?)", (0,)),
+    ("idx_entity_system_id", "entity_system", ("id",),
+        "SELECT user_profile_id FROM entity_system WHERE id = ?", (0,)),
+    ("idx_user_profile_id", "user_profile", ("id",),
+        "SELECT name FROM user_profile WHERE id = ?", (0,)),
+    ("idx_virtualized_item_can_expire", "virtualized_item", ("can_expire",),
+        "SELECT item_entity_id FROM virtualized_item WHERE can_expire = 1", ()),
+    ("idx_virtualized_item_entity_id", "virtualized_item", ("item_entity_id",),
+        "UPDATE virtualized_item SET can_expire = 0 WHERE item_entity_id IN (?)", (0,)),
+    ("idx_base_user_profile_id", "base", ("user_profile_id",),
+        "SELECT id FROM base WHERE user_profile_id = ?", (0,)),
+    ("idx_base_element_base_id", "base_element", ("base_id",),
+        "SELECT location_x, location_y, asset FROM base_element WHERE base_id IN (?)", (0,)),
+]
 
-        # entity
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_class ON entity(class);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_flags ON entity(flags);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_id ON entity(id);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_entity_system_id ON entity(entity_system_id);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_location_xy ON entity(location_x, location_y);")
-
-        # entity_system
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_system_id ON entity_system(id);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_system_user_profile_id ON entity_system(user_profile_id);")
+# Vráti {tabuľka: [stĺpce každého indexu]} vrátane INTEGER PRIMARY KEY ako ("rowid" alias)
+def read_index_schema(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT type, name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')")
+    rows = cursor.fetchall()
+    tables = {row['name'] for row in rows if row['type'] == 'table'}
+    indexed = {table: [] for table in tables}
+    for row in rows:
+        if row['type'] == 'index' and row['tbl_name'] in indexed:
+            columns = tuple(info[2] for info in conn.execute(f"PRAGMA index_info('{row['name']}')"))
+            indexed[row['tbl_name']].append(columns)
+    for table in tables:
+        pk = [info for info in conn.execute(f"PRAGMA table_info('{table}')") if info[5]]
+        if len(pk) == 1 and str(pk[0][2]).upper() == "INTEGER":
+            indexed[table].append((pk[0][1],))
+    return indexed
 
-        # user_profile
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_profile_id ON user_profile(id);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_profile_name ON user_profile(name);")
+# Dotaz potrebuje index, ak jeho plán obsahuje SCAN danej tabuľky bez indexu
+def query_scans_table(conn, query, params, table):
+    pattern = re.compile(rf"^SCAN (TABLE )?{re.escape(table)}\b(?!.*USING)")
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    except sqlite3.Error:
+        return False
+    return any(pattern.match(row[3]) for row in plan)
 
-        # virtualized_item
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_virtualized_item_entity_id ON virtualized_item(item_entity_id);")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_virtualized_item_can_expire ON virtualized_item(can_expire);")
+def plan_indexes(conn):
+    indexed = read_index_schema(conn)
+    missing = []
+    for name, table, columns, query, params in INDEX_CANDIDATES:
+        if table not in indexed:
+            continue  # Tabuľka v tejto verzii hry neexistuje
+        if any(existing[:len(columns)] == columns for existing in indexed[table]):
+            continue  # Stĺpce už pokrýva iný index alebo primárny kľúč
+        if query_scans_table(conn, query, params, table):
+            missing.append((name, table, columns))
+    return missing
 
-        # base
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_base_user_profile_id ON base(user_profile_id);")
+def build_indexes(missing):
+    for name, table, columns in missing:
+        start = time.perf_counter()
+        try:
+            conn = open_writer_connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)});")
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            log_to_console(f"[LOGIC] Chyba pri vytváraní indexu {name}: {e}")
+            continue
+        log_to_console(f"[LOGIC] Index {name} vytvorený za {time.perf_counter() - start:.2f} s")
 
-        conn.commit()
+def ensure_indexes(conn):
+    if not get_config().get("auto_indexes", True):
+        return
+    try:
+        missing = plan_indexes(conn)
     except sqlite3.Error as e:
-        log_to_console(f"[LOGIC] Chyba pri vytváraní indexov: {e}")
+        log_to_console(f"[LOGIC] Chyba pri kontrole indexov: {e}")
+        return
+    if missing:
+        threading.Thread(target=build_indexes, args=(missing,), name="SaveItemsIndexBuilder", daemon=True).start()
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Otvorenie spojenia s databázou ----////
+# Čítacie spojenie (read_only_reader) je otvorené cez URI mode=ro s PRAGMA query_only, takže čítanie
+# nesúťaží so zápismi hry. Zápis ide cez krátko žijúce zapisovacie spojenie (writer_connection),
+# otvorené len keď je čo chrániť. non_invasive = true nikdy nemení journal_mode ani schému SCUM.db.
 def open_db_connection():
+    config = get_config()
+    if not config.get("read_only_reader", True):
+        return open_writer_connection(ensure=True)
+    try:
+        conn = open_reader_connection(config)
+        # Zabezpečenie indexov (čítanie schémy tu, stavba na pozadí cez vlastné spojenie)
+        if not config.get("non_invasive", False):
+            ensure_indexes(conn)
+        return conn
+    except sqlite3.Error as e:
+        log_to_console(f"[LOGIC] Chyba pri otváraní databázy: {e}")
+        return None
+
+# Čisté čítacie spojenie (bez kontroly indexov), používa ho aj pool paralelného čítania
+def open_reader_connection(config, check_same_thread=True):
+    uri = pathlib.Path(DB_PATH).absolute().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=1, check_same_thread=check_same_thread)
+    # Spojenie nikdy nezapíše do databázy
+    conn.execute("PRAGMA query_only = true;")
+    # Pamäťovo mapované čítanie a väčšia cache stránok
+    conn.execute(f"PRAGMA mmap_size = {int(config.get('mmap_size', 268435456))};")
+    conn.execute(f"PRAGMA cache_size = {int(config.get('cache_size', -65536))};")
+    # Povolenie čítania bez zamykania
+    conn.execute("PRAGMA read_uncommitted = true;")
+    # Umožní prístup k stĺpcom podľa názvu
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def open_writer_connection(ensure=False):
+    config = get_config()
     try:
         conn = sqlite3.connect(DB_PATH, timeout=1)
-        # Nastavenie režimu WAL pre lepší výkon
-        conn.execute("PRAGMA journal_mode=WAL;")
+        if not config.get("non_invasive", False):
+            # Nastavenie režimu WAL pre lepší výkon
+            conn.execute("PRAGMA journal_mode=WAL;")
         # Nastavenie režimu zamykania a synchronizácie
         conn.execute("PRAGMA locking_mode=NORMAL;")
         # Nastavenie režimu čítania bez zamykania
@@ -193,11 +693,29 @@ def open_db_connection():
         # Umožní prístup k stĺpcom podľa názvu
         conn.row_factory = sqlite3.Row
         # Zabezpečenie indexov
-        ensure_indexes(conn)
+        if ensure and not config.get("non_invasive", False):
+            ensure_indexes(conn)
         return conn
     except sqlite3.Error as e:
         log_to_console(f"[LOGIC] Chyba pri otváraní databázy: {e}")
         return None
+
+def is_read_only(conn):
+    return bool(conn.execute("PRAGMA query_only").fetchone()[0])
+
+# Pri čítacom spojení otvorí krátko žijúce zapisovacie spojenie, inak použije to isté spojenie
+@contextlib.contextmanager
+def writer_connection(conn):
+    if not is_read_only(conn):
+        yield conn
+        return
+    writer = open_writer_connection()
+    if writer is None:
+        raise sqlite3.OperationalError("SCUM.db sa nepodarilo otvoriť na zápis")
+    try:
+        yield writer
+    finally:
+        close_db_connection(writer)
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Zatvorenie spojenia s databázou ----////    
@@ -297,29 +815,186 @@ def get_expiring_items(conn):
     """)
     rows = cursor.fetchall()
     return [row['item_entity_id'] for row in rows]
+
+# Vráti zoznam ID položiek, ktoré už majú can_expire = 0 (ochránené modulom alebo hrou)
+def get_protected_items(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT item_entity_id
+        FROM virtualized_item
+        WHERE can_expire = 0
+    """)
+    rows = cursor.fetchall()
+    return [row['item_entity_id'] for row in rows]
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Získanie nových položiek od poslednej značky (watermark) ----////
+# Vráti ID položiek s can_expire = 1, ktorých rowid je v rozsahu (watermark, upto]
+def get_expiring_items_since(conn, watermark, upto):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT item_entity_id
+        FROM virtualized_item
+        WHERE can_expire = 1 AND rowid > ? AND rowid <= ?
+    """, (watermark, upto))
+    rows = cursor.fetchall()
+    return [row['item_entity_id'] for row in rows]
+
+# Počet položiek s can_expire = 1 do rowid upto (len index can_expire, bez čítania ID)
+def count_expiring_items_upto(conn, upto):
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT count(*) AS count
+        FROM virtualized_item
+        WHERE can_expire = 1 AND rowid <= ?
+    """, (upto,))
+    return cursor.fetchone()['count']
+
+# Vráti najvyšší rowid v tabuľke virtualized_item (0 ak je prázdna)
+def get_max_item_rowid(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT max(rowid) AS max_rowid FROM virtualized_item")
+    row = cursor.fetchone()
+    return row['max_rowid'] or 0
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Hromadné dotazy s IN (...) po blokoch ----////
+# Namiesto jedného IN zoznamu s tisíckami parametrov (limit SQLITE_MAX_VARIABLE_NUMBER) sa ID posielajú
+# po blokoch pevnej veľkosti. Posledný blok sa doplní opakovaním posledného ID, takže text SQL je vždy
+# rovnaký a sqlite3 znovu použije už skompilovaný príkaz zo svojej cache.
+in_query_cache = {}
+
+def bulk_chunk_size(conn, config=None):
+    if config is None:
+        config = get_config()
+    chunk_size = max(1, int(config.get("bulk_chunk_size", 500)))
+    # Python 3.11+ vie zistiť skutočný limit parametrov, inak platí konzervatívnych 999
+    if hasattr(conn, "getlimit"):
+        limit = conn.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    else:
+        limit = 999
+    return min(chunk_size, limit)
+
+def iter_id_chunks(ids, chunk_size):
+    ids = list(ids)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        if len(chunk) < chunk_size:
+            chunk = chunk + [chunk[-1]] * (chunk_size - len(chunk))
+        yield chunk
+
+def in_query(template, chunk_size):
+    key = (template, chunk_size)
+    query = in_query_cache.get(key)
+    if query is None:
+        query = template.format(placeholders=','.join(['?'] * chunk_size))
+        in_query_cache[key] = query
+    return query
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Získanie pozícií položiek ----////
-def get_item_positions(conn, item_ids):
+def get_item_positions(conn, item_ids, chunk_size=None):
     if not item_ids:
         return {}
-    placeholders = ','.join(['?'] * len(item_ids))
-    query = f"""
-        SELECT id, location_x, location_y 
+    chunk_size = chunk_size or bulk_chunk_size(conn)
+    query = in_query("""
+        SELECT id, location_x, location_y
         FROM entity
         WHERE id IN ({placeholders})
-    """
+    """, chunk_size)
     cursor = conn.cursor()
-    cursor.execute(query, item_ids)
-    rows = cursor.fetchall()
-    return {row['id']: (row['location_x'], row['location_y']) for row in rows}
+    positions = {}
+    for chunk in iter_id_chunks(item_ids, chunk_size):
+        cursor.execute(query, chunk)
+        for row in cursor.fetchall():
+            positions[row['id']] = (row['location_x'], row['location_y'])
+    return positions
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Paralelné čítanie položiek po rozsahoch rowid ----////
+# Pri veľkom rozsahu rowid (plný sken veľkého savu) sa virtualized_item -> entity číta naraz
+# v read_workers vláknach. sqlite3 počas sqlite3_step uvoľňuje GIL, takže dotazy bežia súčasne.
+# Každé vlákno má vlastné čítacie spojenie (mode=ro), rozsah sa delí na read_workers * 4 častí,
+# aby pomalšia časť nebrzdila ostatné. Výsledok je rovnaký ako pri sériovom čítaní.
+read_pool = {
+    "executor": None,
+    "workers": 0,
+    "connections": [],
+    "local": threading.local(),
+    "lock": threading.Lock(),
+}
+
+def get_read_executor(workers):
+    if read_pool["executor"] is not None and read_pool["workers"] == workers:
+        return read_pool["executor"]
+    close_read_pool()
+    read_pool["executor"] = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="SaveItemsReader")
+    read_pool["workers"] = workers
+    return read_pool["executor"]
+
+def close_read_pool():
+    if read_pool["executor"] is not None:
+        read_pool["executor"].shutdown(wait=True)
+    read_pool["executor"] = None
+    read_pool["workers"] = 0
+    read_pool["local"] = threading.local()
+    with read_pool["lock"]:
+        connections, read_pool["connections"] = read_pool["connections"], []
+    for conn in connections:
+        close_db_connection(conn)
+
+# Spojenie vlákna z poolu (otvorí sa pri prvej úlohe vlákna)
+def reader_thread_connection(config):
+    local = read_pool["local"]
+    conn = getattr(local, "conn", None)
+    if conn is None:
+        conn = open_reader_connection(config, check_same_thread=False)
+        local.conn = conn
+        with read_pool["lock"]:
+            read_pool["connections"].append(conn)
+    return conn
+
+def split_rowid_range(watermark, upto, parts):
+    step = max(1, math.ceil((upto - watermark) / parts))
+    return [(start, min(start + step, upto)) for start in range(watermark, upto, step)]
+
+def read_shard(watermark, upto, chunk_size, config):
+    conn = reader_thread_connection(config)
+    item_ids = get_expiring_items_since(conn, watermark, upto)
+    return item_ids, get_item_positions(conn, item_ids, chunk_size)
+
+# Vráti (ID položiek s can_expire = 1 v rozsahu rowid (watermark, upto], {id: (x, y)})
+def read_expiring_positions(conn, watermark, upto, config):
+    workers = int(config.get("read_workers", 1))
+    if workers <= 1 or upto - watermark < config.get("read_parallel_min_rows", 50000):
+        with measure("expiring_items"):
+            item_ids = get_expiring_items_since(conn, watermark, upto)
+        with measure("item_positions"):
+            item_positions = get_item_positions(conn, item_ids)
+        return item_ids, item_positions
+
+    with measure("parallel_read"):
+        executor = get_read_executor(workers)
+        chunk_size = bulk_chunk_size(conn, config)
+        futures = [
+            executor.submit(read_shard, start, end, chunk_size, config)
+            for start, end in split_rowid_range(watermark, upto, workers * 4)
+        ]
+        item_ids = []
+        item_positions = {}
+        for future in futures:
+            shard_ids, shard_positions = future.result()
+            item_ids.extend(shard_ids)
+            item_positions.update(shard_positions)
+    return item_ids, item_positions
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Získanie pozícií zón používateľa ----////
-def get_all_zones_positions(conn, user_profile_id):
-    # Načítame pravidlá z config.json
-    config = load_or_create_config()
-    asset_rules = {entry["asset"]: entry for entry in config.get("zones", [])}
+def get_all_zones_positions(conn, user_profile_id, asset_rules=None):
+    # Načítame pravidlá z config.json (z cache, súbor sa číta len pri zmene)
+    config = get_config()
+    if asset_rules is None:
+        asset_rules = get_asset_rules()
 
     # Získame všetky zóny používateľa
     cursor = conn.cursor()
@@ -331,20 +1006,26 @@ def get_all_zones_positions(conn, user_profile_id):
     player_zones_ids = set(row['id'] for row in cursor.fetchall())
     if not player_zones_ids:
         return []
-    
+
     # Získame pozície a assety pre všetky zóny používateľa
-    placeholders = ','.join(['?'] * len(player_zones_ids))
-    query = f"""
+    chunk_size = bulk_chunk_size(conn, config)
+    query = in_query("""
         SELECT location_x, location_y, asset
         FROM base_element
         WHERE base_id IN ({placeholders})
-    """
-    cursor.execute(query, tuple(player_zones_ids))
-    rows = cursor.fetchall()
+    """, chunk_size)
+    rows = []
+    for chunk in iter_id_chunks(sorted(player_zones_ids), chunk_size):
+        cursor.execute(query, chunk)
+        rows.extend(cursor.fetchall())
 
     # Filterovanie zón podľa pravidiel
+    return filter_zones(((user_profile_id, x, y, asset) for x, y, asset in rows), asset_rules)
+
+# Z riadkov (profil, x, y, asset) ponechá len assety z config.json a doplní polomer a tvar
+def filter_zones(rows, asset_rules):
     filtered = []
-    for x, y, asset in rows:
+    for profile_id, x, y, asset in rows:
         if asset not in asset_rules:
             continue
         rule = asset_rules[asset]
@@ -353,72 +1034,1416 @@ def get_all_zones_positions(conn, user_profile_id):
             "y": y,
             "asset": asset,
             "radius": rule.get("radius", 5000),
-            "shape": rule.get("shape", "square")
+            "shape": rule.get("shape", "square"),
+            "profile_id": profile_id,
         })
     return filtered
 # ////-----------------------------------------------------------------------------------------
 
+# ////---- Zóny všetkých hráčov (profiles_mode = "all") ----////
+# Namiesto jedného profilu sa zóny načítajú jedným dotazom base JOIN base_element pre všetky profily,
+# alebo len pre profily z profiles_allow (ID alebo meno). Každá zóna nesie profile_id vlastníka,
+# takže sa všetky zlúčia do jedného ZoneIndex a sken ostáva jeden pre všetkých hráčov.
+# Výber profilov (selector): int = jeden profil, tuple ID = allow-list, None = všetky profily.
+def get_profile_selector(conn, config, local_profile_id):
+    if config.get("profiles_mode", "local") != "all":
+        return local_profile_id if local_profile_id is not None else ()
+    allow = config.get("profiles_allow") or []
+    if not allow:
+        return None
+    names = {name: profile_id for profile_id, name in get_profile_names(conn).items()}
+    selected = set()
+    for entry in allow:
+        if isinstance(entry, int):
+            selected.add(entry)
+        elif str(entry).isdigit():
+            selected.add(int(entry))
+        elif entry in names:
+            selected.add(names[entry])
+    return tuple(sorted(selected))
+
+# Časť WHERE pre stĺpec user_profile_id podľa výberu profilov
+def profile_filter(selector, column="user_profile_id"):
+    if selector is None:
+        return "1 = 1", ()
+    if isinstance(selector, tuple):
+        if not selector:
+            return "0 = 1", ()
+        return f"{column} IN ({','.join(['?'] * len(selector))})", selector
+    return f"{column} = ?", (selector,)
+
+def get_profile_names(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, name FROM user_profile")
+    return {row['id']: row['name'] for row in cursor.fetchall()}
+
+def get_zones_by_profile(conn, selector, asset_rules=None):
+    clause, params = profile_filter(selector, "b.user_profile_id")
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT b.user_profile_id, e.location_x, e.location_y, e.asset
+        FROM base b
+        JOIN base_element e ON e.base_id = b.id
+        WHERE {clause}
+        ORDER BY b.user_profile_id
+    """, params)
+    return filter_zones(cursor.fetchall(), get_asset_rules() if asset_rules is None else asset_rules)
+
+def load_zones(conn, selector, asset_rules=None):
+    if isinstance(selector, int):
+        return get_all_zones_positions(conn, selector, asset_rules)
+    return get_zones_by_profile(conn, selector, asset_rules)
+
+# Priradí chránené položky prvej zóne, ktorá ich obsahuje; vráti {item_id: zóna}
+def find_protected_zones(item_ids, item_positions, zone_index):
+    protected_zones = {}
+    for item_id in item_ids:
+        x, y = item_positions[item_id]
+        index = zone_index.find_zone(x, y)
+        if index is not None:
+            protected_zones[item_id] = zone_index.zones[index]
+    return protected_zones
+
+# Vráti {profile_id: počet} podľa vlastníka zóny každej chránenej položky
+def count_protected_by_profile(protected_zones):
+    counts = {}
+    for zone in protected_zones.values():
+        counts[zone["profile_id"]] = counts.get(zone["profile_id"], 0) + 1
+    return counts
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Cache zón s detekciou zmien v base / base_element ----////
+# Zóny sa menia zriedka, preto sa znovu načítajú len keď sa zmení lacný odtlačok hráčových riadkov
+# (počet a max rowid v base aj base_element) alebo verzia config.json. Ak sa PRAGMA data_version
+# od posledného odtlačku nezmenila, nikto iný do databázy nezapisoval a netreba ani odtlačok.
+zone_cache = {
+    "key": None,              # (výber profilov, verzia configu, odtlačok)
+    "zones": None,
+    "data_version": None,
+    "hits": 0,
+    "misses": 0,
+    "fingerprint_time": 0.0,  # trvanie posledného odtlačku v sekundách
+    "fingerprint_total": 0.0,
+}
+
+def get_zones_fingerprint(conn, user_profile_id):
+    clause, params = profile_filter(user_profile_id)
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT count(*) AS bases, max(rowid) AS max_rowid
+        FROM base
+        WHERE {clause}
+    """, params)
+    base_row = cursor.fetchone()
+    cursor.execute(f"""
+        SELECT count(*) AS elements, max(rowid) AS max_rowid
+        FROM base_element
+        WHERE base_id IN (SELECT id FROM base WHERE {clause})
+    """, params)
+    element_row = cursor.fetchone()
+    return (base_row['bases'], base_row['max_rowid'], element_row['elements'], element_row['max_rowid'])
+
+# Vráti (all_zones, refreshed) - refreshed je True, ak sa zóny naozaj znovu načítali z databázy
+def get_cached_zones(conn, user_profile_id):
+    start = time.perf_counter()
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    config_version = config_cache["version"]
+    cached_key = zone_cache["key"]
+
+    if (
+        zone_cache["zones"] is not None
+        and data_version == zone_cache["data_version"]
+        and cached_key[:2] == (user_profile_id, config_version)
+    ):
+        zone_cache["hits"] += 1
+        return zone_cache["zones"], False
+
+    key = (user_profile_id, config_version, get_zones_fingerprint(conn, user_profile_id))
+    elapsed = time.perf_counter() - start
+    zone_cache["fingerprint_time"] = elapsed
+    zone_cache["fingerprint_total"] += elapsed
+    zone_cache["data_version"] = data_version
+
+    if zone_cache["zones"] is not None and key == cached_key:
+        zone_cache["hits"] += 1
+        return zone_cache["zones"], False
+
+    zone_cache["misses"] += 1
+    with measure("zone_positions"):
+        zone_cache["zones"] = load_zones(conn, user_profile_id)
+    zone_cache["key"] = key
+    return zone_cache["zones"], True
+
+def get_zone_cache_stats():
+    lookups = zone_cache["hits"] + zone_cache["misses"]
+    return {
+        "hits": zone_cache["hits"],
+        "misses": zone_cache["misses"],
+        "hit_rate": zone_cache["hits"] / lookups if lookups else 0.0,
+        "fingerprint_ms": zone_cache["fingerprint_time"] * 1000,
+        "fingerprint_total_ms": zone_cache["fingerprint_total"] * 1000,
+    }
+# ////-----------------------------------------------------------------------------------------
+
 # ////---- Aktualizácia položiek, ktoré môžu expirovať ----////
-def update_can_expire(conn, item_ids):
-    if not item_ids:
-        return
-    placeholders = ','.join(['?'] * len(item_ids))
-    query = f"""
+def execute_can_expire_update(conn, item_ids, chunk_size=None):
+    chunk_size = chunk_size or bulk_chunk_size(conn)
+    query = in_query("""
         UPDATE virtualized_item
         SET can_expire = 0
         WHERE item_entity_id IN ({placeholders})
-    """
+    """, chunk_size)
     cursor = conn.cursor()
-    cursor.execute(query, item_ids)
+    cursor.executemany(query, iter_id_chunks(item_ids, chunk_size))
+
+def update_can_expire(conn, item_ids, chunk_size=None):
+    if not item_ids:
+        return
+    execute_can_expire_update(conn, item_ids, chunk_size)
     conn.commit()
     log_to_console(f"[Save] {len(item_ids)} Items have been saved!")
 # ////-----------------------------------------------------------------------------------------
 
+# ////---- Zápis s krátkymi transakciami a čakaním na zámok hry ----////
+# Ochrana sa zapisuje po dávkach write_batch_size riadkov, každá dávka v BEGIN IMMEDIATE.
+# Ak hra drží zámok (SQLITE_BUSY), pokus sa opakuje s exponenciálnym backoffom s náhodným rozptylom,
+# po write_max_retries sa nezapísané ID vrátia do fronty a uložia sa pri ďalšom skene.
+# write_state["last"] obsahuje telemetriu posledného zápisu (čakanie na zámok, počet BUSY, zapísané riadky).
+write_state = {
+    "pending": [],   # ID, ktoré sa nepodarilo zapísať a čakajú na ďalší sken
+    "zones": {},     # item_id -> zóna pre položky čakajúce na zápis (štatistika profilov, žurnál)
+    "last": None,
+}
+
+def new_write_telemetry():
+    return {"lock_wait": 0.0, "busy": 0, "rows": 0, "transactions": 0, "requeued": 0}
+
+def is_busy_error(error):
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+# Ručné riadenie transakcií a krátky busy_timeout, aby čakanie riadil backoff a nie SQLite
+@contextlib.contextmanager
+def manual_transactions(conn, config):
+    isolation_level = conn.isolation_level
+    busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+    if conn.in_transaction:
+        conn.commit()
+    conn.isolation_level = None
+    conn.execute(f"PRAGMA busy_timeout = {int(config.get('write_busy_timeout', 50))}")
+    try:
+        yield conn
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+        conn.isolation_level = isolation_level
+
+# Vykoná work(conn) v BEGIN IMMEDIATE ... COMMIT; vráti False, ak sa zámok nepodarilo získať
+def run_write_transaction(conn, work, telemetry, config):
+    retries = max(0, int(config.get("write_max_retries", 5)))
+    backoff = config.get("write_backoff", 0.05)
+    for attempt in range(retries + 1):
+        start = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            telemetry["lock_wait"] += time.perf_counter() - start
+            work(conn)
+            conn.execute("COMMIT")
+            telemetry["transactions"] += 1
+            return True
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if not is_busy_error(e):
+                raise
+            telemetry["busy"] += 1
+            if attempt < retries:
+                delay = backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                time.sleep(delay)
+                telemetry["lock_wait"] += time.perf_counter() - start
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    return False
+
+# Zapíše nové ID aj ID čakajúce z predchádzajúcich skenov; vráti (zapísané ID, telemetria)
+def protect_items(conn, item_ids, config):
+    telemetry = new_write_telemetry()
+    queue_ids = list(dict.fromkeys(write_state["pending"] + list(item_ids)))
+    write_state["pending"] = queue_ids
+    written = []
+    if queue_ids:
+        batch_size = max(1, int(config.get("write_batch_size", 2000)))
+        with writer_connection(conn) as writer, manual_transactions(writer, config):
+            chunk_size = bulk_chunk_size(writer, config)
+            for start in range(0, len(queue_ids), batch_size):
+                batch = queue_ids[start:start + batch_size]
+                done = run_write_transaction(
+                    writer,
+                    lambda c: execute_can_expire_update(c, batch, chunk_size),
+                    telemetry,
+                    config,
+                )
+                if not done:
+                    telemetry["requeued"] = len(queue_ids) - start
+                    log_to_console(f"[LOGIC] SCUM.db je zamknutá hrou, {telemetry['requeued']} položiek sa uloží pri ďalšom skene.")
+                    break
+                telemetry["rows"] += len(batch)
+                written.extend(batch)
+                write_state["pending"] = queue_ids[start + batch_size:]
+        if written:
+            log_to_console(f"[Save] {len(written)} Items have been saved!")
+    write_state["last"] = telemetry
+    return written, telemetry
+
+# Zóny práve zapísaných položiek; odložené položky sa započítajú až pri skutočnom zápise
+def take_written_zones(written):
+    zones = write_state["zones"]
+    return {item_id: zones.pop(item_id) for item_id in written if item_id in zones}
+
+def add_profile_saved(written_zones):
+    for profile_id, count in count_protected_by_profile(written_zones).items():
+        status_state["profile_saved"][profile_id] = status_state["profile_saved"].get(profile_id, 0) + count
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Ochrana položiek priamo v SQLite (scan_mode = "sqlite") ----////
+# Zóny sa nahrajú do dočasnej R*Tree tabuľky (temp schéma patrí len tomuto spojeniu, SCUM.db sa nemení)
+# a položky v zónach nájde jeden SELECT bez prenosu súradníc položiek cez Python. Zapisovacia
+# transakcia sa otvorí len ak SELECT niečo našiel a obsahuje len UPDATE podľa týchto ID.
+# R*Tree ukladá hranice ako float32 zaokrúhlené smerom von, presný test tvaru robí WHERE.
+# Kruh sa porovnáva cez druhé mocniny, keďže sqrt() nemusí byť v SQLite skompilovaná.
+def load_zone_rtree(conn, all_zones):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS temp.zone_rtree
+        USING rtree(id, min_x, max_x, min_y, max_y)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS temp.zone_shape (
+            id INTEGER PRIMARY KEY,
+            x REAL,
+            y REAL,
+            radius REAL,
+            shape TEXT
+        )
+    """)
+    cursor.execute("DELETE FROM temp.zone_rtree")
+    cursor.execute("DELETE FROM temp.zone_shape")
+    cursor.executemany(
+        "INSERT INTO temp.zone_rtree (id, min_x, max_x, min_y, max_y) VALUES (?, ?, ?, ?, ?)",
+        [
+            (index, z["x"] - z["radius"], z["x"] + z["radius"], z["y"] - z["radius"], z["y"] + z["radius"])
+            for index, z in enumerate(all_zones)
+        ],
+    )
+    cursor.executemany(
+        "INSERT INTO temp.zone_shape (id, x, y, radius, shape) VALUES (?, ?, ?, ?, ?)",
+        [(index, z["x"], z["y"], z["radius"], z["shape"]) for index, z in enumerate(all_zones)],
+    )
+    conn.commit()
+
+def protect_items_in_sqlite(conn, all_zones, config, telemetry):
+    # Zapisovacie spojenie je krátko žijúce, temp tabuľky sa preto plnia pri každom skene (pár desiatok riadkov)
+    load_zone_rtree(conn, all_zones)
+
+    # Vyhľadanie položiek v zónach je len čítanie mimo transakcie; zámok hry (BEGIN IMMEDIATE) sa vezme
+    # až keď je čo chrániť a drží sa len počas UPDATE podľa nájdených ID
+    protected_ids = [row[0] for row in conn.execute("""
+        SELECT DISTINCT e.id
+        FROM virtualized_item v
+        JOIN entity e ON e.id = v.item_entity_id
+        JOIN temp.zone_rtree r
+            ON r.min_x <= e.location_x AND r.max_x >= e.location_x
+            AND r.min_y <= e.location_y AND r.max_y >= e.location_y
+        JOIN temp.zone_shape s ON s.id = r.id
+        WHERE v.can_expire = 1 AND (
+            (s.shape = 'square'
+                AND abs(e.location_x - s.x) <= s.radius
+                AND abs(e.location_y - s.y) <= s.radius)
+            OR (s.shape = 'circle'
+                AND (e.location_x - s.x) * (e.location_x - s.x)
+                  + (e.location_y - s.y) * (e.location_y - s.y) <= s.radius * s.radius)
+        )
+    """)]
+    if not protected_ids:
+        return []
+
+    chunk_size = bulk_chunk_size(conn, config)
+    with manual_transactions(conn, config):
+        if not run_write_transaction(conn, lambda c: execute_can_expire_update(c, protected_ids, chunk_size), telemetry, config):
+            log_to_console("[LOGIC] SCUM.db je zamknutá hrou, položky sa uložia pri ďalšom skene.")
+            return []
+    telemetry["rows"] += len(protected_ids)
+    log_to_console(f"[Save] {len(protected_ids)} Items have been saved!")
+    return protected_ids
+
+# Zistí, či SQLite podporuje R*Tree (chýbajúci modul sa zaloguje len raz)
+def sqlite_rtree_available(conn):
+    if scan_state["rtree_available"] is None:
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.zone_rtree USING rtree(id, min_x, max_x, min_y, max_y)")
+            scan_state["rtree_available"] = True
+        except sqlite3.Error as e:
+            scan_state["rtree_available"] = False
+            log_to_console(f"[LOGIC] SQLite R*Tree nie je dostupný ({e}), používam scan_mode = python.")
+    return scan_state["rtree_available"]
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Žurnál ochránených položiek (data/journal.db) ----////
+# Každá položka, ktorej modul prepol can_expire na 0, sa zapíše do vedľajšej SQLite databázy
+# (ID, čas, zóna, profil). Obnova (restore_items) podľa zóny, časového okna alebo všetkého vráti
+# can_expire = 1 množinovými UPDATE po blokoch restore_chunk_size riadkov žurnálu: žurnál sa pripojí
+# cez ATTACH a každý blok (rozsah rowid) je jedna krátka transakcia cez run_write_transaction,
+# ktorá zároveň zmaže obnovené záznamy zo žurnálu.
+journal_state = {
+    "conn": None,
+}
+
+JOURNAL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS protected (
+        item_id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        zone_asset TEXT,
+        zone_x REAL,
+        zone_y REAL,
+        profile_id INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_protected_ts ON protected(ts);
+    CREATE INDEX IF NOT EXISTS idx_protected_zone ON protected(zone_x, zone_y);
+"""
+
+def open_journal():
+    conn = sqlite3.connect(journal_path, timeout=1)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.executescript(JOURNAL_SCHEMA)
+    return conn
+
+def record_journal(item_ids, zones):
+    if not item_ids:
+        return
+    now = time.time()
+    rows = []
+    for item_id in item_ids:
+        zone = zones.get(item_id) or {}
+        rows.append((item_id, now, zone.get("asset"), zone.get("x"), zone.get("y"), zone.get("profile_id")))
+    try:
+        if journal_state["conn"] is None:
+            journal_state["conn"] = open_journal()
+        conn = journal_state["conn"]
+        conn.executemany("INSERT OR REPLACE INTO protected (item_id, ts, zone_asset, zone_x, zone_y, profile_id) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+    except sqlite3.Error as e:
+        log_to_console(f"[LOGIC] Chyba pri zápise do journal.db: {e}")
+
+def close_journal():
+    close_db_connection(journal_state["conn"])
+    journal_state["conn"] = None
+
+# Podmienka nad tabuľkou žurnálu; zóna sa hľadá podľa súradníc prvku základne (tolerancia 0.5)
+# ako rozsah, aby ju vedel použiť index idx_protected_zone
+def journal_filter(zone=None, since=None, until=None):
+    clauses = []
+    params = []
+    if zone is not None:
+        clauses.append("zone_x > ? AND zone_x < ? AND zone_y > ? AND zone_y < ?")
+        params.extend((zone[0] - 0.5, zone[0] + 0.5, zone[1] - 0.5, zone[1] + 0.5))
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    return " AND ".join(clauses) or "1 = 1", params
+
+# Prehľad žurnálu po zónach (pre výber zóny na obnovu)
+def list_journal_zones():
+    if not os.path.exists(journal_path):
+        return []
+    conn = open_journal()
+    try:
+        return conn.execute("""
+            SELECT zone_asset, zone_x, zone_y, profile_id, count(*) AS items, min(ts) AS first_ts, max(ts) AS last_ts
+            FROM protected
+            GROUP BY zone_asset, zone_x, zone_y, profile_id
+            ORDER BY items DESC
+        """).fetchall()
+    finally:
+        conn.close()
+
+# Vráti počet položiek, ktorým sa vrátilo can_expire = 1
+def restore_items(zone=None, since=None, until=None):
+    if not os.path.exists(journal_path):
+        return 0
+    if not DB_PATH or not os.path.exists(DB_PATH):
+        raise FileNotFoundError("SCUM.db sa nenašla (config/path.ini)")
+    config = get_config()
+    open_journal().close()  # schéma (starší žurnál alebo prázdny súbor)
+    clause, params = journal_filter(zone, since, until)
+    chunk_size = max(1, int(config.get("restore_chunk_size", 5000)))
+    telemetry = new_write_telemetry()
+    restored = 0
+    conn = open_writer_connection()
+    if conn is None:
+        raise sqlite3.OperationalError("SCUM.db sa nepodarilo otvoriť na zápis")
+    try:
+        conn.execute("ATTACH DATABASE ? AS journal", (journal_path,))
+        last_rowid = -1
+        with manual_transactions(conn, config):
+            while True:
+                # Horná hranica bloku: rowid chunk_size-teho vyhovujúceho záznamu
+                row = conn.execute(f"""
+                    SELECT max(rowid) FROM (
+                        SELECT rowid FROM journal.protected
+                        WHERE rowid > ? AND {clause}
+                        ORDER BY rowid
+                        LIMIT ?
+                    )
+                """, [last_rowid, *params, chunk_size]).fetchone()
+                if row[0] is None:
+                    break
+                low, high = last_rowid, row[0]
+                updated = 0
+
+                def work(c):
+                    nonlocal updated
+                    cursor = c.execute(f"""
+                        UPDATE virtualized_item
+                        SET can_expire = 1
+                        WHERE can_expire = 0 AND item_entity_id IN (
+                            SELECT item_id FROM journal.protected
+                            WHERE rowid > ? AND rowid <= ? AND {clause}
+                        )
+                    """, [low, high, *params])
+                    updated = cursor.rowcount
+                    c.execute(f"DELETE FROM journal.protected WHERE rowid > ? AND rowid <= ? AND {clause}", [low, high, *params])
+
+                if not run_write_transaction(conn, work, telemetry, config):
+                    raise sqlite3.OperationalError(f"SCUM.db je zamknutá hrou, obnovených {restored} položiek, skúste znova")
+                restored += updated
+                last_rowid = high
+        conn.execute("DETACH DATABASE journal")
+    finally:
+        close_db_connection(conn)
+    log_to_console(f"[LOGIC] Obnovená expirácia {restored} položiek")
+    return restored
+# ////-----------------------------------------------------------------------------------------
+
 # /////////////////////////////////////////////////////////////////////////////////////////////
 # ////---- Hlavná logika modulu ----////
 # /////////////////////////////////////////////////////////////////////////////////////////////
+
+# ////---- Stav inkrementálneho skenovania ----////
+# watermark      - najvyšší rowid z virtualized_item, ktorý už bol skontrolovaný
+# known_outside  - item_id -> (x, y) položiek, ktoré boli pri poslednej kontrole mimo všetkých zón
+# known_missing  - ID s can_expire = 1 pod watermarkom, ku ktorým entity nemá riadok (bez pozície)
+# zones_signature - odtlačok zón z posledného skenu (zmena zón vynúti plný sken)
+# zone_index     - priestorový index zón, prestavaný len pri zmene zón
+# last_full_scan - čas posledného plného skenu
+# rtree_available - podpora R*Tree v SQLite (None = ešte nezistené)
+# db_signature   - odtlačok databázy po poslednom dokončenom skene, skipped - počet preskočených skenov
+scan_state = {
+    "watermark": 0,
+    "known_outside": {},
+    "known_missing": set(),
+    "zones_signature": None,
+    "zone_index": None,
+    "zone_index_config": None,
+    "last_full_scan": 0.0,
+    "rtree_available": None,
+    "db_signature": None,
+    "skipped": 0,
+    "profiles": {},      # profile_id -> {"name": ..., "zones": počet zón}
+}
+
+def reset_scan_state():
+    scan_state["watermark"] = 0
+    scan_state["known_outside"] = {}
+    scan_state["known_missing"] = set()
+    scan_state["zones_signature"] = None
+    scan_state["zone_index"] = None
+    scan_state["zone_index_config"] = None
+    scan_state["last_full_scan"] = 0.0
+    scan_state["db_signature"] = None
+    scan_state["profiles"] = {}
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Odtlačok zón ----////
+# Slúži na zistenie, či sa zóny od posledného skenu zmenili
+def zones_signature(all_zones):
+    return tuple((z["x"], z["y"], z["radius"], z["shape"], z.get("profile_id")) for z in all_zones)
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Test, či je bod v zóne ----////
+# square - štvorec so stranou 2 * radius, circle - kruh s polomerom radius
+def zone_contains(zone, x, y):
+    dx = abs(x - zone["x"])
+    dy = abs(y - zone["y"])
+    shape = zone["shape"]
+    if shape == "square":
+        return dx <= zone["radius"] and dy <= zone["radius"]
+    elif shape == "circle":
+        return math.sqrt(dx**2 + dy**2) <= zone["radius"]
+    return False
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Priestorový index zón (uniformná mriežka) ----////
+# Každá zóna sa zapíše do všetkých buniek mriežky, ktoré prekrýva jej ohraničujúci obdĺžnik.
+# Položka sa potom testuje len proti zónam v bunke, do ktorej padne.
+# Zóny sú v bunke v pôvodnom poradí, takže find_zone vráti tú istú zónu ako lineárny prechod.
+class ZoneIndex:
+    # Rezerva okolo zóny, aby zaokrúhlenie na hranici bunky nevyradilo správnu zónu
+    PADDING = 1.0
+
+    def __init__(self, all_zones, cell_size=0):
+        self.zones = list(all_zones)
+        if not cell_size or cell_size <= 0:
+            radii = [zone["radius"] for zone in self.zones if zone["radius"] > 0]
+            cell_size = 2 * max(radii) if radii else 1.0
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        for index, zone in enumerate(self.zones):
+            if zone["shape"] not in ("square", "circle") or zone["radius"] < 0:
+                continue  # Takáto zóna nikdy nič neochráni
+            reach = zone["radius"] + self.PADDING
+            x0, y0 = self.cell_of(zone["x"] - reach, zone["y"] - reach)
+            x1, y1 = self.cell_of(zone["x"] + reach, zone["y"] + reach)
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    self.cells.setdefault((cx, cy), []).append(index)
+
+    def cell_of(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    # Vráti index prvej zóny, ktorá obsahuje bod, alebo None
+    def find_zone(self, x, y):
+        for index in self.cells.get(self.cell_of(x, y), ()):
+            if zone_contains(self.zones[index], x, y):
+                return index
+        return None
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Určenie položiek, ktoré sú v dosahu zóny ----////
+# Vráti (items_to_protect, outside) kde outside je slovník item_id -> (x, y) položiek mimo zón
+def classify_items(item_positions, zone_index):
+    items_to_protect = []
+    outside = {}
+    find_zone = zone_index.find_zone
+    for item_id, (ix, iy) in item_positions.items():
+        if find_zone(ix, iy) is None:
+            outside[item_id] = (ix, iy)
+        else:
+            items_to_protect.append(item_id)
+    return items_to_protect, outside
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Vektorová klasifikácia cez NumPy ----////
+# Položky sa spracujú po blokoch chunk_items, takže pamäť je obmedzená na chunk_items × počet zón.
+# Výpočet je rovnaký ako v zone_contains (abs, dx**2 + dy**2, sqrt), výsledok je teda identický.
+def classify_items_numpy(item_positions, zone_index, chunk_items=4096):
+    zones = zone_index.zones
+    if not zones or not item_positions:
+        return [], dict(item_positions)
+
+    ids = list(item_positions.keys())
+    coords = np.array([item_positions[item_id] for item_id in ids], dtype=np.float64)
+    zx = np.array([z["x"] for z in zones], dtype=np.float64)
+    zy = np.array([z["y"] for z in zones], dtype=np.float64)
+    radius = np.array([z["radius"] for z in zones], dtype=np.float64)
+    is_square = np.array([z["shape"] == "square" for z in zones])
+    is_circle = np.array([z["shape"] == "circle" for z in zones])
+
+    inside = np.zeros(len(ids), dtype=bool)
+    chunk_items = max(1, int(chunk_items))
+    for start in range(0, len(ids), chunk_items):
+        block = coords[start:start + chunk_items]
+        dx = np.abs(block[:, 0:1] - zx)
+        dy = np.abs(block[:, 1:2] - zy)
+        in_square = is_square & (dx <= radius) & (dy <= radius)
+        in_circle = is_circle & (np.sqrt(dx**2 + dy**2) <= radius)
+        inside[start:start + chunk_items] = (in_square | in_circle).any(axis=1)
+
+    items_to_protect = []
+    outside = {}
+    for item_id, is_inside in zip(ids, inside.tolist()):
+        if is_inside:
+            items_to_protect.append(item_id)
+        else:
+            outside[item_id] = item_positions[item_id]
+    return items_to_protect, outside
+
+# ////---- Klasifikácia v procesoch (classifier = "process") ----////
+# Pri veľmi veľkom počte položiek sa klasifikácia presunie do ProcessPoolExecutor, aby vlákno logiky
+# nedržalo GIL a Qt overlaye sa nezasekávali. Zóny a dávky po process_batch_items položiek idú do
+# procesov ako bajty (zone_worker.pack_zones / pack_items), procesy vrátia bajty s chránenými ID.
+# Pod process_min_items položiek sa použije klasifikácia v tomto vlákne (réžia procesov by prevážila).
+# Ak sa procesy nepodarí spustiť (napr. zmrazený modloader bez freeze_support), režim sa vypne
+# a použije sa klasifikácia v tomto vlákne.
+process_pool = {
+    "executor": None,
+    "workers": 0,
+    "failed": False,
+    "worker": None,   # modul zone_worker
+}
+
+def load_zone_worker():
+    if process_pool["worker"] is None:
+        # Podproces importuje modul pod rovnakým menom zo zložky python (site.addsitedir v initializer)
+        worker_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zone_worker.py")
+        spec = importlib.util.spec_from_file_location("zone_worker", worker_path)
+        worker = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(worker)
+        sys.modules["zone_worker"] = worker
+        process_pool["worker"] = worker
+    return process_pool["worker"]
+
+def get_process_executor(workers):
+    if process_pool["failed"] or getattr(sys, "frozen", False):
+        return None
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    if process_pool["executor"] is not None and process_pool["workers"] == workers:
+        return process_pool["executor"]
+    close_process_pool()
+    process_pool["executor"] = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=site.addsitedir,
+        initargs=(os.path.dirname(os.path.abspath(__file__)),),
+    )
+    process_pool["workers"] = workers
+    return process_pool["executor"]
+
+def close_process_pool():
+    if process_pool["executor"] is not None:
+        process_pool["executor"].shutdown(wait=True, cancel_futures=True)
+    process_pool["executor"] = None
+    process_pool["workers"] = 0
+
+def classify_items_process(item_positions, zone_index, config):
+    if not zone_index.zones or not item_positions:
+        return [], dict(item_positions)
+    executor = None
+    try:
+        worker = load_zone_worker()
+        executor = get_process_executor(int(config.get("process_workers", 0)))
+        if executor is None:
+            log_to_console("[LOGIC] Klasifikácia v procesoch nie je dostupná v zmrazenom modloaderi")
+    except Exception as e:
+        log_to_console(f"[LOGIC] Klasifikácia v procesoch nie je dostupná: {e}")
+    if executor is None:
+        process_pool["failed"] = True
+        return classify_items(item_positions, zone_index)
+
+    ids = list(item_positions.keys())
+    zone_table = worker.pack_zones(zone_index.zones)
+    batch_items = max(1, int(config.get("process_batch_items", 50000)))
+    protected = set()
+    try:
+        futures = [
+            executor.submit(worker.classify_batch, zone_table, zone_index.cell_size, *worker.pack_items(ids[start:start + batch_items], item_positions))
+            for start in range(0, len(ids), batch_items)
+        ]
+        for future in futures:
+            batch = array.array("q")
+            batch.frombytes(future.result())
+            protected.update(batch)
+    except Exception as e:
+        # Rozbitý pool (BrokenProcessPool, chyba spawn) - režim sa vypne do reštartu modulu
+        log_to_console(f"[LOGIC] Klasifikácia v procesoch zlyhala, pokračujem vo vlákne: {e}")
+        process_pool["failed"] = True
+        close_process_pool()
+        return classify_items(item_positions, zone_index)
+
+    items_to_protect = []
+    outside = {}
+    for item_id in ids:
+        if item_id in protected:
+            items_to_protect.append(item_id)
+        else:
+            outside[item_id] = item_positions[item_id]
+    return items_to_protect, outside
+# ////-----------------------------------------------------------------------------------------
+
+# Výber klasifikátora podľa config.json: "python", "numpy", "auto" (NumPy od numpy_min_items položiek)
+# alebo "process" (procesy od process_min_items položiek)
+def select_classifier(config, items_count):
+    mode = config.get("classifier", "python")
+    if mode == "process" and not process_pool["failed"] and items_count >= config.get("process_min_items", 200000):
+        return lambda item_positions, zone_index: classify_items_process(item_positions, zone_index, config)
+    if np is not None and (
+        mode == "numpy"
+        or (mode == "auto" and items_count >= config.get("numpy_min_items", 5000))
+    ):
+        chunk_items = config.get("numpy_chunk_items", 4096)
+        return lambda item_positions, zone_index: classify_items_numpy(item_positions, zone_index, chunk_items)
+    return classify_items
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Rýchla kontrola, či sa databáza od posledného skenu zmenila ----////
+# PRAGMA data_version sa zmení, keď do databázy zapíše iné spojenie (hra), veľkosť a mtime
+# SCUM.db a SCUM.db-wal zachytia aj zápisy, ktoré sa ešte neprejavili v data_version.
+# Odtlačok sa ukladá až po dokončenom skene, teda vrátane našich vlastných zápisov.
+def database_signature(conn):
+    files = []
+    for suffix in ("", "-wal"):
+        try:
+            stat = os.stat(DB_PATH + suffix)
+            files.append((stat.st_mtime_ns, stat.st_size))
+        except (OSError, TypeError):
+            files.append(None)
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    return (data_version, tuple(files), config_cache["version"])
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Jeden sken databázy ----////
+# Pri inkrementálnom skenovaní sa čítajú len riadky virtualized_item s rowid nad watermarkom.
+# Plný sken sa vykoná pri zmene zón, pri prvom skene, po full_rescan_interval sekundách
+# alebo ak rowid v tabuľke klesol pod watermark (napr. obnovená záloha savu).
+# Položky pod watermarkom, ktorým niekto vrátil can_expire = 1 (hra, obnova zo žurnálu), zachytí
+# lacný COUNT nad indexom can_expire: ak nesedí s počtom known_outside, načítajú sa ID pod watermarkom.
+# Presun položky bez nového riadku (UPDATE súradníc v entity) nemá lacný príznak, takáto položka
+# sa skontroluje až pri najbližšom plnom skene (full_rescan_interval).
+def scan_once(conn):
+    config = get_config()
+    incremental = config.get("incremental_scan", True)
+    full_rescan_interval = config.get("full_rescan_interval", 300)
+
+    # Ak sa od posledného dokončeného skenu nič nepohlo, sken sa preskočí
+    if config.get("skip_unchanged", True) and not write_state["pending"]:
+        if database_signature(conn) == scan_state["db_signature"]:
+            scan_state["skipped"] += 1
+            return {"skipped": True, "full_scan": False, "checked": 0, "protected": 0, "zones_changed": False}
+
+    with measure("profile"):
+        user_profile_id = get_user_profile_id(conn)
+        prisoner_name = get_user_name(conn, user_profile_id) if user_profile_id else "N/A"
+        profile_selector = get_profile_selector(conn, config, user_profile_id)
+    with measure("zones"):
+        all_zones, zones_refreshed = get_cached_zones(conn, profile_selector)
+    zone_cache_stats = get_zone_cache_stats()
+    record_count("zones", len(all_zones))
+
+    # Mená a počty zón jednotlivých profilov sa prepočítajú len pri zmene zón
+    if zones_refreshed or not scan_state["profiles"]:
+        names = get_profile_names(conn)
+        profiles = {}
+        for zone in all_zones:
+            profile = profiles.setdefault(zone["profile_id"], {"name": names.get(zone["profile_id"]) or "N/A", "zones": 0})
+            profile["zones"] += 1
+        scan_state["profiles"] = profiles
+
+    # Celá ochrana jedným UPDATE v SQLite
+    protected = None
+    write_telemetry = new_write_telemetry()
+    if config.get("scan_mode", "python") == "sqlite" and scan_state["rtree_available"] is not False:
+        with measure("write"), writer_connection(conn) as writer:
+            if sqlite_rtree_available(writer):
+                protected_ids = protect_items_in_sqlite(writer, all_zones, config, write_telemetry)
+                protected = len(protected_ids)
+        # Zóna a profil (štatistika, žurnál) sa dopočítajú len pre práve ochránené položky
+        if protected:
+            positions = get_item_positions(conn, protected_ids)
+            written_zones = find_protected_zones(positions, positions, ZoneIndex(all_zones, config.get("zone_grid_cell", 0)))
+            add_profile_saved(written_zones)
+            if config.get("journal", True):
+                record_journal(protected_ids, written_zones)
+    if protected is not None:
+        write_state["last"] = write_telemetry
+        set_status_values(prisoner_name=prisoner_name, zones_count=len(all_zones), zone_cache_stats=zone_cache_stats, write_telemetry=write_telemetry, profiles=scan_state["profiles"])
+        scan_state["db_signature"] = database_signature(conn)
+        return {
+            "skipped": False,
+            "full_scan": True,
+            "checked": None,
+            "protected": protected,
+            "zones_changed": None,
+            "writes": write_telemetry,
+        }
+
+    # Rozhodnutie medzi plným a inkrementálnym skenom
+    now = time.time()
+    if zones_refreshed or scan_state["zones_signature"] is None:
+        signature = zones_signature(all_zones)
+    else:
+        signature = scan_state["zones_signature"]
+    max_rowid = get_max_item_rowid(conn)
+    zones_changed = signature != scan_state["zones_signature"]
+    full_scan = (
+        not incremental
+        or zones_changed
+        or max_rowid < scan_state["watermark"]
+        or now - scan_state["last_full_scan"] >= full_rescan_interval
+    )
+
+    # Pri zmene zón už neplatí ani zoznam položiek mimo zón a index sa postaví nanovo
+    if zones_changed:
+        scan_state["known_outside"] = {}
+    if zones_changed or scan_state["zone_index"] is None or scan_state["zone_index_config"] != config_cache["version"]:
+        scan_state["zone_index"] = ZoneIndex(all_zones, config.get("zone_grid_cell", 0))
+        scan_state["zone_index_config"] = config_cache["version"]
+
+    # Získanie položiek, ktoré môžu expirovať, a ich pozícií
+    watermark = 0 if full_scan else scan_state["watermark"]
+    expiring_ids, item_positions = read_expiring_positions(conn, watermark, max_rowid, config)
+    record_count("expiring_items", len(expiring_ids))
+
+    # Zmena can_expire pod watermarkom: nové ID sa skontrolujú, zmiznuté sa vyradia z known_outside.
+    # Očakávaný počet zahŕňa aj ID bez pozície (known_missing) a ID čakajúce na zápis (pending),
+    # inak by sa tieto ID načítali znovu pri každom skene.
+    known_outside = scan_state["known_outside"]
+    known_missing = set() if full_scan else scan_state["known_missing"]
+    pending = set(write_state["pending"])
+    if not full_scan and count_expiring_items_upto(conn, watermark) != len(known_outside) + len(known_missing) + len(pending):
+        with measure("expiring_reset"):
+            below_ids = get_expiring_items_since(conn, 0, watermark)
+            below = set(below_ids)
+            for item_id in [item_id for item_id in known_outside if item_id not in below]:
+                del known_outside[item_id]
+            known_missing &= below
+            reset_ids = [
+                item_id for item_id in below_ids
+                if item_id not in known_outside and item_id not in known_missing and item_id not in pending
+            ]
+            reset_positions = get_item_positions(conn, reset_ids)
+            item_positions.update(reset_positions)
+            known_missing.update(item_id for item_id in reset_ids if item_id not in reset_positions)
+        record_count("expiring_reset", len(reset_ids))
+    known_missing.update(item_id for item_id in expiring_ids if item_id not in item_positions)
+    scan_state["known_missing"] = known_missing
+
+    # Položky, ktoré boli mimo zón a odvtedy sa nepohli, netreba znovu kontrolovať
+    to_check = {
+        item_id: pos for item_id, pos in item_positions.items()
+        if known_outside.get(item_id) != pos
+    }
+    classifier = select_classifier(config, len(to_check))
+    with measure("classify"):
+        items_to_protect, outside = classifier(to_check, scan_state["zone_index"])
+    record_count("checked_items", len(to_check))
+    # Každá chránená položka patrí prvej zóne, ktorá ju obsahuje (profil pre štatistiku, zóna pre žurnál)
+    write_state["zones"].update(find_protected_zones(items_to_protect, to_check, scan_state["zone_index"]))
+
+    # Aktualizácia stavu skenovania
+    if full_scan:
+        known_outside = {
+            item_id: pos for item_id, pos in item_positions.items()
+            if known_outside.get(item_id) == pos
+        }
+        scan_state["last_full_scan"] = now
+    for item_id in items_to_protect:
+        known_outside.pop(item_id, None)
+    known_outside.update(outside)
+    scan_state["known_outside"] = known_outside
+    scan_state["watermark"] = max_rowid
+    scan_state["zones_signature"] = signature
+
+    # Zrušenie despawnu položiek, ktoré sú v dosahu zóny
+    with measure("write"):
+        protected, write_telemetry = protect_items(conn, items_to_protect, config)
+        written_zones = take_written_zones(protected)
+        add_profile_saved(written_zones)
+        if config.get("journal", True):
+            record_journal(protected, written_zones)
+    record_count("protected_items", len(protected))
+    # Aktualizácia stavu (data.ini zapíše main_loop) s informáciami o používateľovi a počte zón
+    set_status_values(prisoner_name=prisoner_name, zones_count=len(all_zones), zone_cache_stats=zone_cache_stats, write_telemetry=write_telemetry, profiles=scan_state["profiles"])
+    scan_state["db_signature"] = database_signature(conn)
+
+    return {
+        "skipped": False,
+        "full_scan": full_scan,
+        "checked": len(to_check),
+        "protected": len(protected),
+        "zones_changed": zones_changed,
+        "writes": write_telemetry,
+        "profiles": count_protected_by_profile(written_zones),
+    }
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Dry-run / what-if bez zápisu do SCUM.db ----////
+# Spočíta, koľko položiek by chránil aktuálny config.json a prípadne kandidátsky config (iný súbor),
+# bez akéhokoľvek zápisu: spojenie je len na čítanie a nestavia ani indexy. Položky (can_expire = 1
+# aj už chránené can_expire = 0) sa prejdú raz a každá sa zaradí do prvej zóny oboch konfigurácií.
+# Zóny sa medzi konfiguráciami párujú podľa (profil, asset, x, y), takže rozdiel ukáže aj zmenu polomeru.
+# Výsledok sa zapíše do data/dry_run.json.
+# Kandidát sa prekryje cez aktuálny config, takže súbor s inými "zones" nezmení profily ani mriežku
+def load_candidate_config(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        candidate = json.load(f)
+    config = dict(get_config())
+    config.update(candidate)
+    return config
+
+def zone_report(zones, counts):
+    return [
+        {
+            "profile_id": zone["profile_id"],
+            "asset": zone["asset"],
+            "x": zone["x"],
+            "y": zone["y"],
+            "radius": zone["radius"],
+            "shape": zone["shape"],
+            "items": count,
+        }
+        for zone, count in zip(zones, counts)
+    ]
+
+def dry_run(conn, candidate_config=None):
+    start = time.perf_counter()
+    config = get_config()
+    user_profile_id = get_user_profile_id(conn)
+    configs = {"current": config}
+    if candidate_config is not None:
+        configs["candidate"] = candidate_config
+
+    indexes = {}
+    for name, variant in configs.items():
+        selector = get_profile_selector(conn, variant, user_profile_id)
+        zones = load_zones(conn, selector, compile_asset_rules(variant))
+        indexes[name] = ZoneIndex(zones, variant.get("zone_grid_cell", 0))
+
+    expiring_ids = get_expiring_items(conn)
+    protected_ids = get_protected_items(conn)
+    item_positions = get_item_positions(conn, expiring_ids + protected_ids)
+    expiring = set(expiring_ids)
+
+    # Jeden prechod cez položky pre obe konfigurácie
+    counts = {name: [0] * len(index.zones) for name, index in indexes.items()}
+    totals = {name: {"expiring": 0, "protected": 0} for name in indexes}
+    gained = 0
+    lost = 0
+    current_index = indexes["current"]
+    candidate_index = indexes.get("candidate")
+    for item_id, (x, y) in item_positions.items():
+        state = "expiring" if item_id in expiring else "protected"
+        current = current_index.find_zone(x, y)
+        if current is not None:
+            counts["current"][current] += 1
+            totals["current"][state] += 1
+        if candidate_index is not None:
+            candidate = candidate_index.find_zone(x, y)
+            if candidate is not None:
+                counts["candidate"][candidate] += 1
+                totals["candidate"][state] += 1
+            if current is None and candidate is not None:
+                gained += 1
+            elif current is not None and candidate is None:
+                lost += 1
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "items": {"expiring": len(expiring_ids), "protected": len(protected_ids)},
+    }
+    for name, index in indexes.items():
+        report[name] = {
+            "zones": len(index.zones),
+            "in_zones": totals[name],
+            "zones_detail": zone_report(index.zones, counts[name]),
+        }
+    if candidate_index is not None:
+        # Zóny, ktoré v kandidátovi pribudli, zmizli alebo chránia iný počet položiek
+        def zone_key(zone):
+            return (zone["profile_id"], zone["asset"], zone["x"], zone["y"])
+        current_zones = {zone_key(z): z for z in report["current"]["zones_detail"]}
+        candidate_zones = {zone_key(z): z for z in report["candidate"]["zones_detail"]}
+        zone_changes = []
+        for key in sorted(set(current_zones) | set(candidate_zones), key=lambda k: (k[0] or 0, k[1], k[2], k[3])):
+            before = current_zones.get(key)
+            after = candidate_zones.get(key)
+            if before and after and (before["items"], before["radius"], before["shape"]) == (after["items"], after["radius"], after["shape"]):
+                continue
+            zone_changes.append({
+                "profile_id": key[0],
+                "asset": key[1],
+                "x": key[2],
+                "y": key[3],
+                "current": {"radius": before["radius"], "shape": before["shape"], "items": before["items"]} if before else None,
+                "candidate": {"radius": after["radius"], "shape": after["shape"], "items": after["items"]} if after else None,
+            })
+        report["diff"] = {"gained": gained, "lost": lost, "zones": zone_changes}
+    report["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return report
+
+# Vstup pre CLI aj widget: otvorí čítacie spojenie, spočíta report a zapíše data/dry_run.json
+def run_dry_run(candidate_path=None):
+    config = get_config()
+    candidate_config = load_candidate_config(candidate_path) if candidate_path else None
+    if not DB_PATH or not os.path.exists(DB_PATH):
+        raise FileNotFoundError("SCUM.db sa nenašla (config/path.ini)")
+    conn = open_reader_connection(config)
+    try:
+        report = dry_run(conn, candidate_config)
+    finally:
+        close_db_connection(conn)
+    report["candidate_path"] = candidate_path
+    temp_path = dry_run_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=4)
+    os.replace(temp_path, dry_run_path)
+    return report
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Sledovanie SCUM.db cez inotify (len Linux, cez ctypes bez ďalších závislostí) ----////
+# Vlákno sleduje zložku so savom a pri zápise do sledovaných súborov nastaví event.
+# Debounce: po prvej udalosti sa čaká, kým nebude debounce sekúnd ticho (najviac 4 × debounce),
+# takže dávka zápisov hry vyvolá len jeden sken. Časovač v main_loop ostáva ako záloha.
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+class DbWatcher:
+    def __init__(self, directory, names, debounce=0.5, on_change=None):
+        self.directory = directory
+        self.names = {name.encode() for name in names}
+        self.debounce = debounce
+        self.on_change = on_change
+        self.event = threading.Event()
+        self.fd = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    # Vráti False, ak inotify nie je k dispozícii (iný systém, chýbajúca libc, zlá cesta)
+    def start(self):
+        if platform.system() != "Linux":
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1")
+            mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+            if libc.inotify_add_watch(fd, os.fsencode(self.directory), mask) < 0:
+                errno = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(errno, "inotify_add_watch", self.directory)
+        except (OSError, AttributeError) as e:
+            log_to_console(f"[LOGIC] Sledovanie SCUM.db nie je dostupné: {e}")
+            return False
+        self.fd = fd
+        self.thread = threading.Thread(target=self.run, name="SaveItemsDbWatcher", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    # Prečíta dostupné udalosti a vráti True, ak sa týkali sledovaných súborov
+    def read_events(self):
+        try:
+            buffer = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return False
+        relevant = False
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(buffer):
+            _wd, _mask, _cookie, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            offset += INOTIFY_EVENT.size
+            name = buffer[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name in self.names:
+                relevant = True
+        return relevant
+
+    def wait_readable(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        return bool(readable)
+
+    def run(self):
+        while not self.stopping.is_set():
+            if not self.wait_readable(0.5) or not self.read_events():
+                continue
+            # Debounce - zber ďalších udalostí z tej istej dávky zápisov
+            deadline = time.monotonic() + self.debounce * 4
+            while not self.stopping.is_set():
+                remaining = min(self.debounce, deadline - time.monotonic())
+                if remaining <= 0 or not self.wait_readable(remaining):
+                    break
+                self.read_events()
+            self.event.set()
+            if self.on_change:
+                self.on_change()
+
+# Spustí sledovanie zložky so SCUM.db, ak je zapnuté v config.json; inak vráti None
+def start_db_watcher(config):
+    if not config.get("watch_db", True) or not DB_PATH:
+        return None
+    db_name = os.path.basename(DB_PATH)
+    watcher = DbWatcher(
+        os.path.dirname(os.path.abspath(DB_PATH)),
+        [db_name, db_name + "-wal"],
+        config.get("watch_debounce", 0.5),
+    )
+    return watcher if watcher.start() else None
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Adaptívny plánovač skenovania ----////
+# Po skene, ktorý skontroloval nové alebo zmenené položky (aj mimo zón), niečo ochránil alebo
+# zaznamenal zmenu zón, sa ďalší sken spustí po scan_interval_min.
+# Prvý sken bez aktivity vráti interval na scan_interval, po scan_idle_scans skenoch bez aktivity
+# sa interval násobí scan_backoff_factor až do scan_interval_max.
+scheduler_state = {
+    "interval": SCAN_INTERVAL,
+    "idle_scans": 0,
+}
+
+def next_scan_interval(result, config):
+    base = config.get("scan_interval", 8)
+    minimum = min(config.get("scan_interval_min", base), base)
+    maximum = max(config.get("scan_interval_max", base), base)
+    factor = max(config.get("scan_backoff_factor", 2.0), 1.0)
+    idle_limit = config.get("scan_idle_scans", 3)
+
+    active = bool(result) and (result.get("checked") or result.get("protected") or result.get("zones_changed"))
+    if active:
+        scheduler_state["idle_scans"] = 0
+        scheduler_state["interval"] = minimum
+    else:
+        scheduler_state["idle_scans"] += 1
+        interval = max(scheduler_state["interval"], base)
+        if scheduler_state["idle_scans"] >= idle_limit:
+            interval = interval * factor
+        scheduler_state["interval"] = min(interval, maximum)
+    return scheduler_state["interval"]
+
+# Čakanie na ďalší sken; stop_event (alebo wake_event od DbWatcher) preruší čakanie okamžite
+def wait_for_next_scan(interval, stop_event=None, wake_event=None):
+    if wake_event:
+        wake_event.wait(interval)
+        wake_event.clear()
+    elif stop_event:
+        stop_event.wait(interval)
+    else:
+        time.sleep(interval)
+
+# Preposlanie stop_event do wake_event, aby sa čakanie na wake_event skončilo aj pri zastavení
+def forward_stop_event(stop_event, wake_event):
+    def forward():
+        stop_event.wait()
+        wake_event.set()
+    threading.Thread(target=forward, name="SaveItemsStopForward", daemon=True).start()
+# ////-----------------------------------------------------------------------------------------
+
 def main_loop(conn=None, stop_event=None):
+    # Sledovanie zápisov do SCUM.db zobudí slučku skôr ako časovač
+    watcher = start_db_watcher(get_config())
+    wake_event = watcher.event if watcher else None
+    if watcher and stop_event:
+        forward_stop_event(stop_event, wake_event)
+
     # Hlavná slučka pre kontrolu položiek a ich expiráciu
-    while not (stop_event and stop_event.is_set()):
+    try:
+        while not (stop_event and stop_event.is_set()):
+            result = None
+            scan_start = time.time()
+            scan_timer = time.perf_counter()
+            try:
+                result = scan_once(conn)
+            except Exception as e:
+                log_to_console(f"[CHYBA] {e}")
+            scan_duration = time.perf_counter() - scan_timer
+            record_phase("skipped_scan" if result and result["skipped"] else "scan", scan_duration)
+            if result:
+                status_state["items_saved"] += result["protected"]
+            config = get_config()
+            apply_scan_interval(config)
+            interval = next_scan_interval(result, config)
+            with measure("status"):
+                update_data_ini(
+                    scan_interval=interval,
+                    last_scan={
+                        "time": scan_start,
+                        "duration": scan_duration,
+                        "skipped": bool(result and result["skipped"]),
+                    },
+                )
+            publish_metrics(config)
+            # Počkáme interval sekúnd (alebo na zápis do SCUM.db) pred ďalšou kontrolou
+            if stop_event and stop_event.is_set():
+                break  # Ukončí cyklus okamžite, ak bol stop_event nastavený
+            else:
+                wait_for_next_scan(interval, stop_event, wake_event)
+    finally:
+        close_read_pool()
+        close_process_pool()
+        close_journal()
+        publish_metrics(get_config(), force=True)
+        if watcher:
+            watcher.stop()
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Logika v samostatnom procese (logic_process = true) ----////
+# Supervisor vo vlákne modloadera spustí nový interpreter (multiprocessing spawn), ktorý cez
+# runpy.run_path vykoná tento súbor pod menom LOGIC_CHILD_RUN_NAME a spustí run_logic.
+# Správy cez Pipe:
+#   potomok -> rodič: ("ready", pid), ("log", riadok), ("bus", topic, payload), ("exit",)
+#   rodič -> potomok: ("stop",)
+# Riadky logu zapisuje do log.txt len rodič (jediný zapisovač a rotácia), log.txt sa vyčistí len
+# raz pred prvým štartom, takže hláška o páde potomka reštart prežije. Ostatné udalosti zbernice
+# (status) sa v rodičovi publikujú do status_bus, takže widgety fungujú rovnako ako pri vlákne.
+# stop_event rodiča sa premení na správu "stop"; zatvorená pipe (pád rodiča) zastaví potomka.
+# Pád potomka (exit bez "exit") sa reštartuje s exponenciálnym odstupom do logic_restart_max_delay
+# sekúnd. Ak prvý potomok nenahlási "ready" do LOGIC_READY_TIMEOUT sekúnd alebo skončí skôr,
+# ukončí sa, vráti sa False a logika beží vo vlákne.
+# Potomok nie je daemon, aby v ňom fungoval classifier = "process" (daemon nesmie mať vlastné procesy).
+# Pri ukončení modloadera bez stop_event ho zastaví atexit handler: registruje sa až po importe
+# multiprocessing, preto beží skôr ako jeho čakanie na procesy, ktoré nie sú daemon.
+LOGIC_CHILD_RUN_NAME = "__saveitems_logic_child__"
+LOGIC_STOP_TIMEOUT = 10
+LOGIC_READY_TIMEOUT = 30
+
+logic_process_state = {
+    "process": None,
+    "pipe": None,
+    "atexit": False,
+}
+
+def stop_logic_process(process, pipe):
+    try:
+        pipe.send(("stop",))
+    except (OSError, ValueError):
+        pass
+    process.join(LOGIC_STOP_TIMEOUT)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+
+def stop_logic_process_at_exit():
+    process = logic_process_state["process"]
+    if process is not None and process.is_alive():
+        stop_logic_process(process, logic_process_state["pipe"])
+
+def start_logic_process():
+    context = multiprocessing.get_context("spawn")
+    parent_pipe, child_pipe = context.Pipe()
+    process = context.Process(
+        target=runpy.run_path,
+        args=(os.path.abspath(__file__),),
+        kwargs={"init_globals": {"SAVEITEMS_PIPE": child_pipe}, "run_name": LOGIC_CHILD_RUN_NAME},
+        name="SaveItemsLogic",
+        daemon=False,
+    )
+    process.start()
+    child_pipe.close()
+    logic_process_state["process"] = process
+    logic_process_state["pipe"] = parent_pipe
+    if not logic_process_state["atexit"]:
+        atexit.register(stop_logic_process_at_exit)
+        logic_process_state["atexit"] = True
+    return process, parent_pipe
+
+# Preposiela správy potomka, kým nebeží stop alebo potomok neskončí; vráti (ready, clean_exit)
+def supervise_logic_process(process, pipe, stop_event):
+    ready = False
+    deadline = time.time() + LOGIC_READY_TIMEOUT
+    while not stop_event.is_set():
+        try:
+            if not pipe.poll(0.2):
+                if not process.is_alive():
+                    return ready, False
+                if not ready and time.time() > deadline:
+                    # Zaseknutý štart (import, spawn): potomok sa ukončí ako pri páde
+                    log_to_console(f"[LOGIC] Proces logiky nenahlásil štart do {LOGIC_READY_TIMEOUT} s")
+                    process.terminate()
+                    process.join(LOGIC_STOP_TIMEOUT)
+                    return ready, False
+                continue
+            message = pipe.recv()
+        except (EOFError, OSError):
+            return ready, False
+        if message[0] == "ready":
+            ready = True
+        elif message[0] == "log":
+            write_log_line(message[1])
+        elif message[0] == "bus":
+            status_bus.publish(message[1], message[2])
+        elif message[0] == "exit":
+            return ready, True
+
+    # Zastavenie potomka cez pipe, pri zaseknutí terminate
+    stop_logic_process(process, pipe)
+    return ready, True
+
+def run_logic_process(stop_event=None):
+    if getattr(sys, "frozen", False):
+        log_to_console("[LOGIC] logic_process nie je dostupný v zmrazenom modloaderi, logika beží vo vlákne")
+        return False
+    stop_event = stop_event or threading.Event()
+    restarts = 0
+    ever_ready = False
+    while not stop_event.is_set():
+        started = time.time()
         try:
-            # Získanie všetkých položiek, ktoré môžu expirovať
-            # a ich pozícií
-            # a pozícií všetkých zón používateľa
-            # a mena používateľa
-            expiring_ids = get_expiring_items(conn)
-            item_positions = get_item_positions(conn, expiring_ids)
-            user_profile_id = get_user_profile_id(conn)
-            prisoner_name = get_user_name(conn, user_profile_id) if user_profile_id else "N/A"
-            all_zones = get_all_zones_positions(conn, user_profile_id)
-
-            # Určenie položiek, ktoré sú v dosahu zóny
-            items_to_protect = []
-            for item_id, (ix, iy) in item_positions.items():
-                for base in all_zones:
-                    bx, by = base["x"], base["y"]
-                    radius = base["radius"]
-                    shape = base["shape"]
-                    dx = abs(ix - bx)
-                    dy = abs(iy - by)
-                    if shape == "square":
-                        if dx <= radius and dy <= radius:
-                            items_to_protect.append(item_id)
-                            break
-                    elif shape == "circle":
-                        if math.sqrt(dx**2 + dy**2) <= radius:
-                            items_to_protect.append(item_id)
-                            break
-            # Zrušenie despawnu položiek, ktoré sú v dosahu zóny
-            update_can_expire(conn, items_to_protect)
-            # Aktualizácia data.ini s informáciami o používateľovi a počte zón
-            update_data_ini(prisoner_name=prisoner_name, zones_count=len(all_zones))
+            process, pipe = start_logic_process()
         except Exception as e:
-            log_to_console(f"[CHYBA] {e}")
-        # Počkáme SCAN_INTERVAL sekúnd pred ďalšou kontrolou
-        if stop_event and stop_event.is_set():
-            break  # Ukončí cyklus okamžite, ak bol stop_event nastavený
-        else:
-            time.sleep(SCAN_INTERVAL)
+            if ever_ready:
+                log_to_console(f"[LOGIC] Reštart procesu logiky zlyhal: {e}")
+                stop_event.wait(get_config().get("logic_restart_max_delay", 30))
+                continue
+            log_to_console(f"[LOGIC] Proces logiky sa nepodarilo spustiť, logika beží vo vlákne: {e}")
+            return False
+        try:
+            ready, clean_exit = supervise_logic_process(process, pipe, stop_event)
+        finally:
+            pipe.close()
+        ever_ready = ever_ready or ready
+        if clean_exit or stop_event.is_set():
+            return True
+        process.join(LOGIC_STOP_TIMEOUT)
+        if not ever_ready:
+            log_to_console(f"[LOGIC] Proces logiky sa nespustil (kód {process.exitcode}), logika beží vo vlákne")
+            return False
+
+        # Pád potomka: reštart s odstupom, po minúte stabilného behu sa odstup vynuluje
+        if time.time() - started > 60:
+            restarts = 0
+        delay = min(get_config().get("logic_restart_max_delay", 30), 2 ** restarts)
+        restarts += 1
+        log_to_console(f"[LOGIC] Proces logiky spadol (kód {process.exitcode}), reštart o {delay} s")
+        stop_event.wait(delay)
+    return True
+
+# Vstup potomka: preposielanie zbernice do pipe a stop z pipe do stop_event
+def run_logic_child(pipe):
+    stop_event = threading.Event()
+    send_lock = threading.Lock()
+
+    def send(message):
+        with send_lock:
+            try:
+                pipe.send(message)
+            except (OSError, ValueError):
+                stop_event.set()  # Rodič už nebeží
+
+    def listen():
+        while True:
+            try:
+                message = pipe.recv()
+            except (EOFError, OSError):
+                break
+            if message[0] == "stop":
+                break
+        stop_event.set()
+
+    log_sink["send"] = send
+    status_bus.subscribe(lambda topic, payload: send(("bus", topic, payload)))
+    threading.Thread(target=listen, name="SaveItemsLogicPipe", daemon=True).start()
+    send(("ready", os.getpid()))
+    try:
+        run_logic(stop_event, reset=False)
+    finally:
+        send(("exit",))
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Spustenie hlavnej funkcie z main.py ----////
@@ -427,13 +2452,32 @@ def logic_main_init(stop_event=None):
     #if main.MODLOADER_VERSION < (0, 1):
     #    return
 
-    # Vytvoríme log.txt ak neexistuje
+    # Logika v samostatnom procese (GIL procesu modloadera ostáva overlayom); ak sa proces
+    # nepodarí spustiť, logika beží vo vlákne ako doteraz
+    if get_config().get("logic_process", False) and __name__ != LOGIC_CHILD_RUN_NAME:
+        reset_log()
+        if run_logic_process(stop_event):
+            return
+        run_logic(stop_event, reset=False)
+        return
+    run_logic(stop_event)
+
+# Vytvoríme log.txt ak neexistuje (správy z načítania modulu sa najprv dopíšu, potom sa log vyčistí)
+def reset_log():
+    flush_log()
     try:
-        with open(log_path, 'w') as f:
+        with open(log_path, 'w', encoding='utf-8') as f:
             f.write("[SaveItems] Module Loaded...\n")
+        status_bus.publish("log_reset", None)
+        status_bus.publish("log", "[SaveItems] Module Loaded...")
     except Exception as e:
         print(f"[LOGIC] Nepodarilo sa vytvoriť log.txt: {e}")
 
+# reset = False: log už vyčistil rodič (proces logiky, reštart, návrat do vlákna)
+def run_logic(stop_event=None, reset=True):
+    if reset:
+        reset_log()
+
     # Ak DB_PATH neexistuje, vypíšeme správu a ukončíme logiku
     if not DB_PATH or not os.path.exists(DB_PATH):
         log_to_console("[SaveItems] SCUM.db file not found or disk is disconnected. Please enter the path manually in config/path.ini and restart the application.")
@@ -452,8 +2496,42 @@ def logic_main_init(stop_event=None):
     except Exception as e:
         log_to_console(f"[LOGIC] Chyba pri otváraní databázy: {e}")
         return
+    finally:
+        flush_log()
 # ////-----------------------------------------------------------------------------------------
 
 # ////---- Spustenie hlavnej funkcie priamo ----////
 if __name__ == "__main__":
-    logic_main_init()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="SaveItems logika")
+    parser.add_argument("--dry-run", nargs="?", const="", metavar="CANDIDATE_JSON",
+                        help="len spočíta ochranu (voliteľne porovná s kandidátskym configom) bez zápisu do SCUM.db")
+    parser.add_argument("--journal-zones", action="store_true", help="vypíše zóny v žurnáli ochránených položiek")
+    parser.add_argument("--restore-all", action="store_true", help="vráti can_expire = 1 všetkým položkám zo žurnálu")
+    parser.add_argument("--restore-zone", metavar="X,Y", help="obnova len pre zónu so súradnicami X,Y (z --journal-zones)")
+    parser.add_argument("--restore-since", metavar="ČAS", help="obnova položiek ochránených od ČAS (ISO, napr. 2026-01-31T18:00)")
+    parser.add_argument("--restore-until", metavar="ČAS", help="obnova položiek ochránených pred ČAS (ISO)")
+    args = parser.parse_args()
+    if args.journal_zones:
+        for row in list_journal_zones():
+            print(f"{row[4]:>8} items  zone={row[1]},{row[2]}  profile={row[3]}  {row[0]}  "
+                  f"{datetime.fromtimestamp(row[5]):%Y-%m-%d %H:%M} - {datetime.fromtimestamp(row[6]):%Y-%m-%d %H:%M}")
+    elif args.restore_all or args.restore_zone or args.restore_since or args.restore_until:
+        zone = tuple(float(value) for value in args.restore_zone.split(",")) if args.restore_zone else None
+        since = datetime.fromisoformat(args.restore_since).timestamp() if args.restore_since else None
+        until = datetime.fromisoformat(args.restore_until).timestamp() if args.restore_until else None
+        try:
+            print(f"Obnovená expirácia {restore_items(zone, since, until)} položiek")
+        except FileNotFoundError as e:
+            print(e)
+        flush_log()
+    elif args.dry_run is not None:
+        result = run_dry_run(args.dry_run or None)
+        print(f"current: {result['current']['in_zones']} v {result['current']['zones']} zónach")
+        if "candidate" in result:
+            print(f"candidate: {result['candidate']['in_zones']} v {result['candidate']['zones']} zónach")
+            print(f"diff: +{result['diff']['gained']} / -{result['diff']['lost']}")
+        print(f"Report: {dry_run_path} ({result['duration_ms']} ms)")
+    else:
+        logic_main_init()
+elif __name__ == LOGIC_CHILD_RUN_NAME:
+    run_logic_child(SAVEITEMS_PIPE)
\ No newline at end of file
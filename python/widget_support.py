@@ -0,0 +1,68 @@
+# /////////////////////////////////////////////////////////////////////////////////////////////
+# ////---- Spoločné pomocné triedy widgetov (Console, Mini console, Prisoner) ----////
+# Modloader načíta každý súbor vo widgets/ ako widget, preto je tento modul v python/ (ako zone_worker).
+# Widgety ho načítajú cez load_widget_support raz a zdieľajú ho cez sys.modules.
+# /////////////////////////////////////////////////////////////////////////////////////////////
+import os
+import sys
+
+from PySide6.QtCore import QObject, Signal
+
+# ////---- Most zo zbernice logiky (iné vlákno) do Qt ----////
+# Logika v tom istom procese publikuje udalosti do sys.modules["saveitems_status_bus"].
+# Signál sa doručí do GUI vlákna cez frontu (AutoConnection medzi vláknami).
+class BusBridge(QObject):
+    received = Signal(str, object)
+
+def get_status_bus():
+    registry = sys.modules.get("saveitems_status_bus")
+    return getattr(registry, "bus", None)
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Sledovanie konca log.txt ----////
+# Pamätá si pozíciu v súbore a pri každom volaní prečíta len nové bajty.
+# Ak bol súbor rotovaný (iný inode) alebo skrátený, začne odznova a vráti reset = True.
+# Pri prvom čítaní veľkého súboru sa načíta len jeho koniec (TAIL_BYTES).
+class LogTail:
+    TAIL_BYTES = 65536
+
+    def __init__(self, path, max_lines=64):
+        self.path = path
+        self.max_lines = max_lines
+        self.offset = 0
+        self.identity = None
+        self.partial = b""
+
+    def read_new_lines(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            reset = self.identity is not None
+            self.identity = None
+            self.offset = 0
+            self.partial = b""
+            return reset, []
+
+        reset = False
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self.identity or stat.st_size < self.offset:
+            reset = True
+            self.identity = identity
+            self.offset = max(0, stat.st_size - self.TAIL_BYTES)
+            self.partial = b""
+        if stat.st_size == self.offset:
+            return reset, []
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+        skip_first = reset and self.offset > 0  # prvý riadok za TAIL_BYTES môže byť neúplný
+        self.offset += len(data)
+
+        parts = (self.partial + data).split(b"\n")
+        self.partial = parts.pop()
+        if skip_first and parts:
+            parts = parts[1:]
+        lines = [part.decode("utf-8", errors="replace").rstrip("\r") for part in parts]
+        return reset, lines[-self.max_lines:]
+# ////-----------------------------------------------------------------------------------------
@@ -0,0 +1,83 @@
+# /////////////////////////////////////////////////////////////////////////////////////////////
+# ////---- Klasifikácia položiek v podprocese (classifier = "process") ----////
+# Modul nemá žiadne závislosti na logic.py, aby ho podproces ProcessPoolExecutor vedel importovať
+# bez spustenia logiky modulu (config, log, detekcia SCUM.db). Zóny aj položky sa prenášajú
+# ako bajty z array.array, nie ako zoznamy tuple, takže pickle je lacný.
+# /////////////////////////////////////////////////////////////////////////////////////////////
+import array
+import math
+
+SHAPES = {"square": 0, "circle": 1}
+ZONE_FIELDS = 4  # x, y, radius, tvar
+
+# Rezerva okolo zóny ako v logic.ZoneIndex
+PADDING = 1.0
+
+# ////---- Zabalenie zón a položiek do bajtov ----////
+def pack_zones(zones):
+    table = array.array("d")
+    for zone in zones:
+        table.extend((zone["x"], zone["y"], zone["radius"], SHAPES.get(zone["shape"], -1)))
+    return table.tobytes()
+
+def pack_items(item_ids, item_positions):
+    ids = array.array("q", item_ids)
+    xs = array.array("d", (item_positions[item_id][0] for item_id in item_ids))
+    ys = array.array("d", (item_positions[item_id][1] for item_id in item_ids))
+    return ids.tobytes(), xs.tobytes(), ys.tobytes()
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Mriežka zón v podprocese ----////
+# Postaví sa raz pre danú tabuľku zón a veľkosť bunky, ďalšie dávky ju len použijú
+grid_cache = {"key": None, "zones": None, "cells": None}
+
+def get_grid(zone_table, cell_size):
+    key = (zone_table, cell_size)
+    if grid_cache["key"] == key:
+        return grid_cache["zones"], grid_cache["cells"]
+    values = array.array("d")
+    values.frombytes(zone_table)
+    zones = [tuple(values[i:i + ZONE_FIELDS]) for i in range(0, len(values), ZONE_FIELDS)]
+    cells = {}
+    for index, (x, y, radius, shape) in enumerate(zones):
+        if shape < 0 or radius < 0:
+            continue  # Takáto zóna nikdy nič neochráni
+        reach = radius + PADDING
+        x0, y0 = math.floor((x - reach) / cell_size), math.floor((y - reach) / cell_size)
+        x1, y1 = math.floor((x + reach) / cell_size), math.floor((y + reach) / cell_size)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cells.setdefault((cx, cy), []).append(index)
+    grid_cache["key"] = key
+    grid_cache["zones"] = zones
+    grid_cache["cells"] = cells
+    return zones, cells
+# ////-----------------------------------------------------------------------------------------
+
+# ////---- Klasifikácia jednej dávky ----////
+# Výpočet je rovnaký ako v logic.zone_contains (abs, dx**2 + dy**2, sqrt).
+# Vráti bajty array("q") s ID položiek, ktoré sú v niektorej zóne.
+def classify_batch(zone_table, cell_size, ids_bytes, xs_bytes, ys_bytes):
+    zones, cells = get_grid(zone_table, cell_size)
+    ids = array.array("q")
+    ids.frombytes(ids_bytes)
+    xs = array.array("d")
+    xs.frombytes(xs_bytes)
+    ys = array.array("d")
+    ys.frombytes(ys_bytes)
+
+    protected = array.array("q")
+    for item_id, ix, iy in zip(ids, xs, ys):
+        for index in cells.get((math.floor(ix / cell_size), math.floor(iy / cell_size)), ()):
+            zx, zy, radius, shape = zones[index]
+            dx = abs(ix - zx)
+            dy = abs(iy - zy)
+            if shape == 0:
+                if dx <= radius and dy <= radius:
+                    protected.append(item_id)
+                    break
+            elif math.sqrt(dx**2 + dy**2) <= radius:
+                protected.append(item_id)
+                break
+    return protected.tobytes()
+# ////-----------------------------------------------------------------------------------------
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "python"))
+
+import benchmark
+
+
+# Čerstvý modul logic.py; log, data.ini a path.ini idú do dočasnej zložky testu
+@pytest.fixture
+def logic(tmp_path):
+    return benchmark.load_logic(str(tmp_path))
+
+
+# Syntetická SCUM.db s položkami pri zónach aj mimo nich, logika ju číta s daným configom
+@pytest.fixture
+def scum_db(logic, tmp_path):
+    def make(items=2000, zones=20, **overrides):
+        db_path = str(tmp_path / "SCUM.db")
+        benchmark.make_scum_db(db_path, items, zones, asset_mix=benchmark.default_asset_mix(logic), seed=3)
+        config = dict(logic.get_config(), journal=False, skip_unchanged=False, **overrides)
+        logic.get_config = lambda: config
+        logic.DB_PATH = db_path
+        return db_path
+    return make
@@ -0,0 +1,83 @@
+import math
+import random
+
+import pytest
+
+import benchmark
+
+
+# Zóny s bodmi presne na hranách štvorca a kružnice, tesne za nimi a zóny s polomerom 0 a záporným
+def edge_case_zones():
+    return [
+        {"x": 0.0, "y": 0.0, "asset": "square", "radius": 10.0, "shape": "square"},
+        {"x": 100.0, "y": 200.0, "asset": "circle", "radius": 5.0, "shape": "circle"},
+        {"x": -50.0, "y": -50.0, "asset": "point", "radius": 0.0, "shape": "square"},
+        {"x": 60.0, "y": -60.0, "asset": "point", "radius": 0.0, "shape": "circle"},
+        {"x": 300.0, "y": 300.0, "asset": "negative", "radius": -5.0, "shape": "square"},
+        {"x": 400.0, "y": 400.0, "asset": "negative", "radius": -5.0, "shape": "circle"},
+        {"x": 500.0, "y": 500.0, "asset": "unknown", "radius": 50.0, "shape": "triangle"},
+    ]
+
+
+def edge_case_items():
+    points = [
+        # Hrany a rohy štvorca (polomer 10)
+        (10.0, 0.0), (-10.0, 0.0), (0.0, 10.0), (0.0, -10.0), (10.0, 10.0), (-10.0, -10.0),
+        (math.nextafter(10.0, math.inf), 0.0), (0.0, math.nextafter(-10.0, -math.inf)),
+        # Kružnica (polomer 5): 3-4-5 trojuholník leží presne na hranici
+        (103.0, 204.0), (97.0, 196.0), (105.0, 200.0), (100.0, 195.0),
+        (math.nextafter(105.0, math.inf), 200.0), (103.0, math.nextafter(204.0, math.inf)),
+        # Polomer 0: len stred zóny
+        (-50.0, -50.0), (math.nextafter(-50.0, 0.0), -50.0), (60.0, -60.0), (60.0, math.nextafter(-60.0, 0.0)),
+        # Záporný polomer a neznámy tvar nechránia nič, ani stred
+        (300.0, 300.0), (400.0, 400.0), (500.0, 500.0),
+    ]
+    return {item_id: point for item_id, point in enumerate(points, start=1)}
+
+
+def random_case():
+    rng = random.Random(4)
+    zones = benchmark.random_zones(40, 20000.0, rng)
+    items = benchmark.random_items(5000, zones, 20000.0, rng)
+    return zones, items
+
+
+CASES = [
+    pytest.param(edge_case_zones, edge_case_items, id="edges"),
+    pytest.param(lambda: random_case()[0], lambda: random_case()[1], id="random"),
+]
+
+# Malé bunky mriežky len pre malé zóny z edge_case_zones (pri polomere 5000 by mali milióny buniek)
+GRID_CASES = [
+    pytest.param(make_zones, make_items, cell_size, id=f"{case.id}-cell{cell_size}")
+    for case in CASES
+    for make_zones, make_items in [case.values]
+    for cell_size in ([0, 1.0, 5.0, 10.0, 333.3] if case.id == "edges" else [0, 1000.0, 7777.7])
+]
+
+
+@pytest.mark.parametrize("make_zones, make_items, cell_size", GRID_CASES)
+def test_classify_items_matches_nested_loop(logic, make_zones, make_items, cell_size):
+    zones, items = make_zones(), make_items()
+    expected = sorted(benchmark.classify_nested_loop(items, zones))
+    protected, outside = logic.classify_items(items, logic.ZoneIndex(zones, cell_size))
+    assert sorted(protected) == expected
+    assert sorted(outside) == sorted(set(items) - set(expected))
+
+
+@pytest.mark.parametrize("chunk_items", [1, 7, 4096])
+@pytest.mark.parametrize("make_zones, make_items", CASES)
+def test_classify_items_numpy_matches_nested_loop(logic, make_zones, make_items, chunk_items):
+    if logic.np is None:
+        pytest.skip("NumPy nie je nainštalované")
+    zones, items = make_zones(), make_items()
+    expected = sorted(benchmark.classify_nested_loop(items, zones))
+    protected, outside = logic.classify_items_numpy(items, logic.ZoneIndex(zones), chunk_items)
+    assert sorted(protected) == expected
+    assert sorted(outside) == sorted(set(items) - set(expected))
+
+
+def test_edge_cases_expected_result():
+    # Kontrola samotnej referencie: ktoré body sú chránené
+    expected = set(benchmark.classify_nested_loop(edge_case_items(), edge_case_zones()))
+    assert expected == {1, 2, 3, 4, 5, 6, 9, 10, 11, 12, 15, 17}
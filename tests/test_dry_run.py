@@ -0,0 +1,15 @@
+import json
+
+
+def test_candidate_keeps_current_settings(logic, tmp_path):
+    config = dict(logic.get_config(), profiles_mode="all", profiles_allow=[7], zone_grid_cell=2500)
+    logic.get_config = lambda: config
+    candidate_path = tmp_path / "candidate.json"
+    candidate_path.write_text(json.dumps({"zones": [{"asset": "flag", "radius": 10, "shape": "circle"}]}), encoding="utf-8")
+
+    candidate = logic.load_candidate_config(str(candidate_path))
+    assert candidate["zones"] == [{"asset": "flag", "radius": 10, "shape": "circle"}]
+    assert candidate["profiles_mode"] == "all"
+    assert candidate["profiles_allow"] == [7]
+    assert candidate["zone_grid_cell"] == 2500
+    assert config["zones"] != candidate["zones"]
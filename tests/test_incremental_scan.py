@@ -0,0 +1,69 @@
+import sqlite3
+
+
+def track_reset_reads(logic):
+    # Načítanie všetkých ID pod watermarkom (rozsah od 0) robí len kontrola zmien can_expire
+    calls = []
+    original = logic.get_expiring_items_since
+
+    def get_expiring_items_since(conn, watermark, upto):
+        if watermark == 0:
+            calls.append(upto)
+        return original(conn, watermark, upto)
+
+    logic.get_expiring_items_since = get_expiring_items_since
+    return calls
+
+
+def test_reset_below_watermark_is_protected_once(logic, scum_db):
+    db_path = scum_db()
+    conn = logic.open_db_connection()
+    assert logic.scan_once(conn)["full_scan"]
+    calls = track_reset_reads(logic)
+
+    db = sqlite3.connect(db_path)
+    item_id = db.execute("SELECT item_entity_id FROM virtualized_item WHERE can_expire = 0 LIMIT 1").fetchone()[0]
+    db.execute("UPDATE virtualized_item SET can_expire = 1 WHERE item_entity_id = ?", (item_id,))
+    db.commit()
+
+    result = logic.scan_once(conn)
+    assert not result["full_scan"]
+    assert result["protected"] == 1
+    assert len(calls) == 1
+
+    # Ďalší sken už počty zhodné, ID pod watermarkom sa znovu nečítajú
+    logic.scan_once(conn)
+    assert len(calls) == 1
+
+
+def test_orphan_and_pending_ids_do_not_repeat_reset_path(logic, scum_db):
+    db_path = scum_db()
+    conn = logic.open_db_connection()
+    logic.scan_once(conn)
+    calls = track_reset_reads(logic)
+
+    # Riadok virtualized_item bez riadku v entity nemá pozíciu a nikdy nebude v known_outside
+    db = sqlite3.connect(db_path)
+    orphan_id = db.execute("SELECT max(id) FROM entity").fetchone()[0] + 1
+    db.execute("INSERT INTO virtualized_item (item_entity_id, can_expire) VALUES (?, 1)", (orphan_id,))
+    db.commit()
+    logic.scan_once(conn)
+    logic.scan_once(conn)
+    assert calls == []
+    assert orphan_id in logic.scan_state["known_missing"]
+
+    # Zápis zlyhá (hra drží zámok), ID ostanú v pending s can_expire = 1
+    item_id = db.execute("SELECT item_entity_id FROM virtualized_item WHERE can_expire = 0 LIMIT 1").fetchone()[0]
+    db.execute("UPDATE virtualized_item SET can_expire = 1 WHERE item_entity_id = ?", (item_id,))
+    db.commit()
+    run_write_transaction = logic.run_write_transaction
+    logic.run_write_transaction = lambda *args, **kwargs: False
+    assert logic.scan_once(conn)["writes"]["requeued"] == 1
+    assert len(calls) == 1
+    logic.scan_once(conn)
+    assert len(calls) == 1
+
+    logic.run_write_transaction = run_write_transaction
+    assert logic.scan_once(conn)["protected"] == 1
+    logic.scan_once(conn)
+    assert len(calls) == 1
@@ -0,0 +1,10 @@
+def test_new_items_outside_zones_keep_short_interval(logic):
+    config = dict(logic.get_config(), scan_interval=8, scan_interval_min=2, scan_interval_max=64, scan_idle_scans=1)
+    idle = {"skipped": False, "checked": 0, "protected": 0, "zones_changed": False}
+    for _ in range(5):
+        logic.next_scan_interval(idle, config)
+    assert logic.scheduler_state["interval"] > 8
+
+    # Nové položky mimo zón (nič sa neochránilo) sú tiež aktivita
+    interval = logic.next_scan_interval(dict(idle, checked=3), config)
+    assert interval == 2
@@ -0,0 +1,38 @@
+import sqlite3
+
+import pytest
+
+
+def protected_ids(db_path):
+    db = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in db.execute("SELECT item_entity_id FROM virtualized_item WHERE can_expire = 0")}
+    finally:
+        db.close()
+
+
+def test_sqlite_mode_matches_python_mode(logic, scum_db):
+    db_path = scum_db(scan_mode="python")
+    logic.scan_once(logic.open_db_connection())
+    expected = protected_ids(db_path)
+
+    db_path = scum_db(scan_mode="sqlite")
+    logic.reset_scan_state()
+    result = logic.scan_once(logic.open_db_connection())
+    if logic.scan_state["rtree_available"] is False:
+        pytest.skip("SQLite bez R*Tree")
+    assert result["protected"] == len(expected)
+    assert protected_ids(db_path) == expected
+
+
+def test_sqlite_mode_takes_no_write_lock_without_work(logic, scum_db):
+    scum_db(scan_mode="sqlite")
+    conn = logic.open_db_connection()
+    logic.scan_once(conn)
+    if logic.scan_state["rtree_available"] is False:
+        pytest.skip("SQLite bez R*Tree")
+
+    result = logic.scan_once(conn)
+    assert result["protected"] == 0
+    assert result["writes"]["transactions"] == 0
+    assert result["writes"]["lock_wait"] == 0
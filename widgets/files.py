@@ -1,8 +1,10 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget, QLabel
-from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QListWidget, QLabel, QFileDialog
+from PySide6.QtCore import Qt, QTimer
 import os
 import sys
 import subprocess
+import threading
+import importlib.util
 
 def create_widget(BaseClass, module_name):
     class SettingsWidget(BaseClass):
@@ -54,6 +56,21 @@ def create_widget(BaseClass, module_name):
             self.btn_open_data.clicked.connect(lambda: self.open_selected_file("data"))
             data_layout.addWidget(self.btn_open_data)
             
+            # Tlačidlo na obnovenie zoznamov (napr. metrics.json vznikne až po prvom skene)
+            self.btn_refresh = QPushButton("Refresh")
+            self.btn_refresh.clicked.connect(self.load_files)
+            main_layout.addWidget(self.btn_refresh)
+            
+            # Dry-run: spočíta ochranu (aj pre kandidátsky config) bez zápisu do SCUM.db
+            self.btn_dry_run = QPushButton("Dry Run...")
+            self.btn_dry_run.clicked.connect(self.start_dry_run)
+            main_layout.addWidget(self.btn_dry_run)
+            self.dry_run_thread = None
+            self.dry_run_result = None
+            self.logic = None
+            self.dry_run_timer = QTimer(self)
+            self.dry_run_timer.timeout.connect(self.check_dry_run)
+            
             # Načítaj súbory
             self.load_files()
         
@@ -137,6 +154,64 @@ def create_widget(BaseClass, module_name):
             except Exception as e:
                 print(f"Error opening file {file_path}: {e}")
     
+        def load_logic(self):
+            """Vráti modul python/logic.py, ktorý už načítal modloader; inak ho načíta raz a uloží (dry-run je len na čítanie)"""
+            if self.logic is not None:
+                return self.logic
+            # Získaj cestu k python zložke (rovnaká úroveň ako config)
+            config_path = self.get_config_path("")
+            parent_dir = os.path.dirname(config_path.rstrip('/\\'))
+            logic_path = os.path.normcase(os.path.realpath(os.path.join(parent_dir, "python", "logic.py")))
+            for module in list(sys.modules.values()):
+                module_file = getattr(module, "__file__", None)
+                if module_file and os.path.normcase(os.path.realpath(module_file)) == logic_path:
+                    self.logic = module
+                    return module
+            spec = importlib.util.spec_from_file_location("saveitems_logic_dry_run", logic_path)
+            logic = importlib.util.module_from_spec(spec)
+            # Logika beží mimo modloadera: vlastná zbernica, widgety ostanú pri čítaní data.ini / log.txt
+            logic.SAVEITEMS_PRIVATE_BUS = True
+            spec.loader.exec_module(logic)
+            sys.modules["saveitems_logic_dry_run"] = logic
+            self.logic = logic
+            return logic
+        
+        def start_dry_run(self):
+            """Spustí dry-run na pozadí; kandidátsky config je voliteľný (Cancel = len aktuálny)"""
+            if self.dry_run_thread is not None:
+                return
+            candidate_path, _ = QFileDialog.getOpenFileName(
+                self, "Candidate config (Cancel = current config only)", self.get_config_path(""), "JSON (*.json)"
+            )
+            
+            def run():
+                try:
+                    logic = self.load_logic()
+                    logic.run_dry_run(candidate_path or None)
+                    self.dry_run_result = True
+                except Exception as e:
+                    print(f"Error running dry run: {e}")
+                    self.dry_run_result = False
+            
+            self.dry_run_result = None
+            self.btn_dry_run.setEnabled(False)
+            self.btn_dry_run.setText("Dry Run (running...)")
+            self.dry_run_thread = threading.Thread(target=run, name="SaveItemsDryRun", daemon=True)
+            self.dry_run_thread.start()
+            self.dry_run_timer.start(200)
+        
+        def check_dry_run(self):
+            """Po dokončení dry-runu obnoví zoznam a otvorí dry_run.json"""
+            if self.dry_run_thread is None or self.dry_run_thread.is_alive():
+                return
+            self.dry_run_timer.stop()
+            self.dry_run_thread = None
+            self.btn_dry_run.setEnabled(True)
+            self.btn_dry_run.setText("Dry Run...")
+            self.load_files()
+            if self.dry_run_result:
+                self.open_file("dry_run.json", "data")
+    
     return SettingsWidget()
 
 def get_widget_dock_position():
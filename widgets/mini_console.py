@@ -2,6 +2,8 @@ from PySide6.QtWidgets import QTextEdit, QVBoxLayout, QLabel, QApplication
 from PySide6.QtCore import QTimer, Qt
 from PySide6.QtGui import QPixmap, QPalette
 import os
+import sys
+import importlib.util
 
 # ////---- Jednoduchá detekcia dark mode ----////
 # Táto funkcia by mala fungovať na všetkých platformách
@@ -11,6 +13,19 @@ def is_dark_mode():
     # jednoduchá heuristika: ak je pozadie tmavé, berieme to ako dark mode
     return window_color.lightness() < 128
 
+# ////---- Spoločné pomocné triedy (python/widget_support.py: BusBridge, get_status_bus, LogTail) ----////
+# Cesta sa odvodí od config zložky; modul sa načíta raz a ostatné widgety ho nájdu v sys.modules.
+def load_widget_support(config_path):
+    module = sys.modules.get("saveitems_widget_support")
+    if module is None:
+        parent_dir = os.path.dirname(config_path.rstrip('/\\'))
+        support_path = os.path.join(parent_dir, "python", "widget_support.py")
+        spec = importlib.util.spec_from_file_location("saveitems_widget_support", support_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules["saveitems_widget_support"] = module
+    return module
+
 # ////---- Vytvorenie widgetu konzoly ----////
 def create_widget(BaseClass, module_name):
     class ConsoleWidget(BaseClass):
@@ -26,34 +41,67 @@ def create_widget(BaseClass, module_name):
             # konzola
             self.text = QTextEdit()
             self.text.setReadOnly(True)
+            self.text.document().setMaximumBlockCount(64)  # posledných 64 riadkov
             layout.addWidget(self.text)
 
             # test counter
             self.counter = 0
 
-            # timer na pravidelný update
+            # spoločné pomocné triedy (zbernica, čítanie log.txt)
+            self.support = load_widget_support(self.get_config_path(""))
+
+            # čítanie log.txt len od poslednej pozície
+            self.tail = self.support.LogTail(self.get_data_path("log.txt"))
+
+            # zbernica logiky (ak logika beží v tom istom procese)
+            self.bus = None
+            self.bridge = self.support.BusBridge()
+            self.bridge.received.connect(self.on_bus_event)
+
+            # timer na pravidelný update (kým nie je zbernica, číta sa log.txt)
             self.timer = QTimer(self)
             self.timer.timeout.connect(self.update_widget)
             self.timer.start(1000)  # každú sekundu
 
-        def update_widget(self):
-            log_file = self.get_data_path("log.txt")
+        def attach_bus(self):
+            bus = self.support.get_status_bus()
+            if bus is None:
+                return False
+            self.bus = bus
+            self.bus_callback = self.bus.subscribe(self.bridge.received.emit)
+            return True
 
-            log_lines = []
+        def on_bus_event(self, topic, payload):
+            if topic == "log_reset":
+                self.text.clear()
+            elif topic == "log":
+                self.text.append(payload)
 
-            # načítanie log.txt
-            if os.path.exists(log_file):
-                with open(log_file, "r", encoding="utf-8") as f:
-                    log_lines = f.readlines()[-64:]  # posledných 64 riadkov
+        def update_widget(self):
+            # Po pripojení na zbernicu prichádzajú nové riadky cez signál
+            if self.bus is not None:
+                return
+            attached = self.attach_bus()
 
-            # vyčistenie a vypísanie do konzoly
-            self.text.clear()
+            # načítanie nových riadkov z log.txt
+            reset, log_lines = self.tail.read_new_lines()
+
+            # pri rotácii / skrátení logu sa konzola vyčistí, inak sa len pridajú nové riadky
+            if reset:
+                self.text.clear()
             for line in log_lines:
                 self.text.append(line.strip())
 
+            # po pripojení na zbernicu už timer netreba
+            if attached:
+                self.timer.stop()
+
         def close_widget(self):
-            # zastavenie timeru a vyčistenie textu
+            # zastavenie timeru, odhlásenie zo zbernice a vyčistenie textu
             self.timer.stop()
+            if self.bus is not None:
+                self.bus.unsubscribe(self.bus_callback)
+                self.bus = None
             self.text.clear()
 
     return ConsoleWidget()
@@ -2,6 +2,8 @@ from PySide6.QtWidgets import QTextEdit, QVBoxLayout, QLabel, QHBoxLayout, QAppl
 from PySide6.QtCore import QTimer, Qt
 from PySide6.QtGui import QPixmap, QPalette
 import os
+import sys
+import importlib.util
 
 # ////---- Jednoduchá detekcia dark mode ----////
 # Táto funkcia by mala fungovať na všetkých platformách
@@ -11,9 +13,25 @@ def is_dark_mode():
     # jednoduchá heuristika: ak je pozadie tmavé, berieme to ako dark mode
     return window_color.lightness() < 128
 
+# ////---- Spoločné pomocné triedy (python/widget_support.py: BusBridge, get_status_bus, LogTail) ----////
+# Cesta sa odvodí od config zložky; modul sa načíta raz a ostatné widgety ho nájdu v sys.modules.
+def load_widget_support(config_path):
+    module = sys.modules.get("saveitems_widget_support")
+    if module is None:
+        parent_dir = os.path.dirname(config_path.rstrip('/\\'))
+        support_path = os.path.join(parent_dir, "python", "widget_support.py")
+        spec = importlib.util.spec_from_file_location("saveitems_widget_support", support_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules["saveitems_widget_support"] = module
+    return module
+
 # ////---- Vytvorenie widgetu konzoly ----////
 def create_widget(BaseClass, module_name):
     class PrisonerWidget(BaseClass):
+        # Počet profilov zobrazených vo widgete (ostatné sa zhrnú do "+N more")
+        MAX_PROFILES = 6
+
         def __init__(self):
             super().__init__(module_name)
 
@@ -22,7 +40,7 @@ def create_widget(BaseClass, module_name):
             self.setLayout(layout)
 
             self.setMinimumSize(333, 100)
-            self.setMaximumSize(4000, 150)
+            self.setMaximumSize(4000, 320)
 
             # banner
             if is_dark_mode():
@@ -70,41 +88,111 @@ def create_widget(BaseClass, module_name):
 
             layout.addLayout(zones_layout)
 
+            # SCAN INTERVAL (aktuálny interval adaptívneho plánovača)
+            interval_layout = QHBoxLayout()
+            interval_label = QLabel("SCAN INTERVAL")
+            interval_label.setStyleSheet("font-size: 12px; font-weight: bold;")
+            interval_layout.addWidget(interval_label)
+
+            self.interval_value = QLabel("N/A")
+            self.interval_value.setStyleSheet("font-size: 16px; font-weight: bolt; color: #ff8000;")
+            self.interval_value.setAlignment(Qt.AlignVCenter | Qt.AlignLeft)
+            interval_layout.addWidget(self.interval_value)
+
+            layout.addLayout(interval_layout)
+
+            # PROFILES (profiles_mode = "all": zóny a uložené položky každého hráča)
+            self.profiles_value = QLabel("")
+            self.profiles_value.setStyleSheet("font-size: 12px;")
+            self.profiles_value.setAlignment(Qt.AlignVCenter | Qt.AlignLeft)
+            self.profiles_value.setVisible(False)
+            layout.addWidget(self.profiles_value)
+
             # test counter
             self.counter = 0
 
-            # timer na pravidelný update
+            # zbernica logiky (ak logika beží v tom istom procese)
+            self.support = load_widget_support(self.get_config_path(""))
+            self.bus = None
+            self.bridge = self.support.BusBridge()
+            self.bridge.received.connect(self.on_bus_event)
+
+            # timer na pravidelný update (kým nie je zbernica, číta sa data.ini)
             self.timer = QTimer(self)
             self.timer.timeout.connect(self.update_widget)
             self.timer.start(1000)  # každú sekundu
 
+        def attach_bus(self):
+            bus = self.support.get_status_bus()
+            if bus is None:
+                return False
+            self.bus = bus
+            self.bus_callback = self.bus.subscribe(self.bridge.received.emit)
+            status = self.bus.last_value("status")
+            if status is not None:
+                self.apply_status(status)
+            return True
+
+        def on_bus_event(self, topic, payload):
+            if topic == "status":
+                self.apply_status(payload)
+
         def update_widget(self):
-            # Len refreshuje hodnoty z data.ini
+            # Len refreshuje hodnoty z data.ini, kým nie je dostupná zbernica logiky
             self.counter += 1
 
-            data_file = self.get_data_path("data.ini")
+            if self.bus is not None or self.attach_bus():
+                self.timer.stop()
+                return
 
-            prisoner_name = "N/A"
-            all_zones_count = "0"
+            data_file = self.get_data_path("data.ini")
 
             # načítanie data.ini
             if os.path.exists(data_file):
                 import configparser
                 config = configparser.ConfigParser()
                 config.read(data_file)
+                self.apply_status(config)
+            else:
+                self.apply_status({})
 
-                if "prisoner" in config and "name" in config["prisoner"]:
-                    prisoner_name = config["prisoner"]["name"]
-                if "all_zones" in config and "count" in config["all_zones"]:
-                    all_zones_count = config["all_zones"]["count"]
+        def apply_status(self, config):
+            prisoner_name = "N/A"
+            all_zones_count = "0"
+            scan_interval = "N/A"
+
+            if "prisoner" in config and "name" in config["prisoner"]:
+                prisoner_name = config["prisoner"]["name"]
+            if "all_zones" in config and "count" in config["all_zones"]:
+                all_zones_count = config["all_zones"]["count"]
+            if "scan" in config and "interval" in config["scan"]:
+                scan_interval = f"{config['scan']['interval']} s"
+
+            # Profily zo sekcií [profile.<id>], zoradené podľa počtu uložených položiek
+            profiles = []
+            for section in config:
+                if not section.startswith("profile."):
+                    continue
+                profile = config[section]
+                profiles.append((int(profile.get("items_saved", "0")), profile.get("name", "N/A"), profile.get("zones", "0")))
+            profiles.sort(key=lambda profile: (-profile[0], profile[1]))
+            lines = [f"{name}: {zones} zones, {saved} saved" for saved, name, zones in profiles[:self.MAX_PROFILES]]
+            if len(profiles) > self.MAX_PROFILES:
+                lines.append(f"+{len(profiles) - self.MAX_PROFILES} more")
 
             # ⚡️ tu nastavíš labely aby sa UI obnovilo
             self.prisoner_value.setText(prisoner_name)
             self.zones_value.setText(all_zones_count)
+            self.interval_value.setText(scan_interval)
+            self.profiles_value.setText("\n".join(lines))
+            self.profiles_value.setVisible(len(profiles) > 1)
 
         def close_widget(self):
-            # zastavenie timeru
+            # zastavenie timeru a odhlásenie zo zbernice
             self.timer.stop()
+            if self.bus is not None:
+                self.bus.unsubscribe(self.bus_callback)
+                self.bus = None
 
     return PrisonerWidget()
 